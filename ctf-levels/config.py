@@ -1,18 +1,154 @@
 from langchain_openai import ChatOpenAI
+from openai import AsyncOpenAI, OpenAI
+import hashlib
+import httpx
 import os
+import threading
+import time
 
 # Configuration variables from environment variables with defaults
 OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.gpu.nextcnf.com/v1')
 API_KEY = os.getenv('API_KEY', 'fbchan09876')  # Default for local testing; replace with secure value in production
 MODEL = os.getenv('MODEL', 'llama3')  # Default model for chat completions
 EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'nomic-embed-text')  # Model for embeddings
+VECTOR_BACKEND = os.getenv('VECTOR_BACKEND', 'chroma')  # Retriever index for the RAG level: 'chroma' or 'numpy' (in-process, no chromadb)
 USE_API_KEY_FOR_EMBEDDINGS = os.getenv('USE_API_KEY_FOR_EMBEDDINGS', 'True') == 'True'  # Convert string to boolean
 SHOW_SOURCE_DOCUMENTS = os.getenv('SHOW_SOURCE_DOCUMENTS', 'False') == 'True'  # Convert string to boolean
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', 'True') == 'True'  # Render chat answers token by token
+
+# Shared HTTP connection pool for all LLM clients in this process
+LLM_HTTP2 = os.getenv('LLM_HTTP2', 'True') == 'True'  # Multiplex requests over keep-alive HTTP/2 connections
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '20'))  # Hard cap on sockets per inference host
+LLM_MAX_KEEPALIVE = int(os.getenv('LLM_MAX_KEEPALIVE', '10'))  # Idle sockets kept warm per inference host
+LLM_KEEPALIVE_EXPIRY = float(os.getenv('LLM_KEEPALIVE_EXPIRY', '120'))  # Seconds before an idle socket is closed
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '120'))  # Seconds per request (connect timeout is capped at 10)
+LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', '16'))  # Concurrent LLM calls per process; the rest wait in a queue
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '120'))  # Seconds a request may wait for a slot before failing
+
+# ====================== LLM Client Registry ======================
+# Streamlit re-executes every level script on each rerun, so anything built at
+# import time is rebuilt per prompt. The registry hands out one client per
+# (base_url, model, api_key, params) and one httpx pool per inference host.
+_registry_lock = threading.Lock()
+_http_pools = {}
+_llm_clients = {}
+_openai_clients = {}
+_async_openai_clients = {}
+_stats = {"llm_hits": 0, "llm_misses": 0, "openai_hits": 0, "openai_misses": 0}
+
+
+def _http_pool(base_url):
+    """Return the (sync, async) httpx clients shared by everything talking to base_url."""
+    pool = _http_pools.get(base_url)
+    if pool is None:
+        limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        )
+        timeout = httpx.Timeout(LLM_TIMEOUT, connect=min(LLM_TIMEOUT, 10.0))
+        pool = {
+            "sync": httpx.Client(http2=LLM_HTTP2, limits=limits, timeout=timeout),
+            "async": httpx.AsyncClient(http2=LLM_HTTP2, limits=limits, timeout=timeout),
+            "created": time.time()
+        }
+        _http_pools[base_url] = pool
+    return pool
+
+
+def _client_key(base_url, model, api_key, params):
+    return (base_url, model, api_key, tuple(sorted((k, repr(v)) for k, v in params.items())))
+
 
 # Initialize LLM with remote Ollama API
-def get_llm():
-    return ChatOpenAI(
-        base_url=OPENAI_BASE_URL,
-        api_key=API_KEY,
-        model=MODEL
-    )
+def get_llm(model=None, base_url=None, api_key=None, **params):
+    """Return the process-wide ChatOpenAI client for these settings, creating it on first use."""
+    base_url = base_url or OPENAI_BASE_URL
+    model = model or MODEL
+    api_key = api_key or API_KEY
+    key = _client_key(base_url, model, api_key, params)
+    with _registry_lock:
+        llm = _llm_clients.get(key)
+        if llm is not None:
+            _stats["llm_hits"] += 1
+            return llm
+        _stats["llm_misses"] += 1
+        pool = _http_pool(base_url)
+        llm = ChatOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            model=model,
+            http_client=pool["sync"],
+            http_async_client=pool["async"],
+            **params
+        )
+        _llm_clients[key] = llm
+        return llm
+
+
+def get_openai_client(base_url=None, api_key=API_KEY, **params):
+    """Return the process-wide raw OpenAI SDK client (tool calls, embeddings) sharing the same pool."""
+    base_url = base_url or OPENAI_BASE_URL
+    key = _client_key(base_url, None, api_key, params)
+    with _registry_lock:
+        client = _openai_clients.get(key)
+        if client is not None:
+            _stats["openai_hits"] += 1
+            return client
+        _stats["openai_misses"] += 1
+        client = OpenAI(
+            base_url=base_url,
+            # The SDK refuses api_key=None, so keyless endpoints get a placeholder
+            api_key=api_key or "no-key",
+            http_client=_http_pool(base_url)["sync"],
+            **params
+        )
+        _openai_clients[key] = client
+        return client
+
+
+def get_async_openai_client(base_url=None, api_key=API_KEY, **params):
+    """Async twin of get_openai_client, on the pool's async side (used through the LLM gateway)."""
+    base_url = base_url or OPENAI_BASE_URL
+    key = _client_key(base_url, None, api_key, params)
+    with _registry_lock:
+        client = _async_openai_clients.get(key)
+        if client is not None:
+            _stats["openai_hits"] += 1
+            return client
+        _stats["openai_misses"] += 1
+        client = AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key or "no-key",
+            http_client=_http_pool(base_url)["async"],
+            **params
+        )
+        _async_openai_clients[key] = client
+        return client
+
+
+def llm_pool_stats():
+    """Snapshot of the client registry for debugging and health pages (API keys are hashed)."""
+    with _registry_lock:
+        def describe(key):
+            base_url, model, api_key, params = key
+            return {
+                "base_url": base_url,
+                "model": model,
+                "api_key": hashlib.sha256((api_key or "").encode()).hexdigest()[:12],
+                "params": dict(params)
+            }
+
+        return {
+            **_stats,
+            "http2": LLM_HTTP2,
+            "limits": {
+                "max_connections": LLM_MAX_CONNECTIONS,
+                "max_keepalive_connections": LLM_MAX_KEEPALIVE,
+                "keepalive_expiry": LLM_KEEPALIVE_EXPIRY
+            },
+            "pools": {url: {"created": pool["created"]} for url, pool in _http_pools.items()},
+            "llm_clients": [describe(key) for key in _llm_clients],
+            "openai_clients": [describe(key) for key in _openai_clients],
+            "async_openai_clients": [describe(key) for key in _async_openai_clients]
+        }
@@ -0,0 +1,26 @@
+# ctf_levels - Shared core for the CTF level pages
+from .chat_view import render_chat_history
+from .completion_cache import cached_response
+from .core import Level, API_BASE_URL
+from .dashboard import sidebar_panel
+from .gateway import gateway, llm_ainvoke, llm_call, llm_slot
+from .readiness import start_backend_monitor, wait_for_backend
+from .streaming import stream_response, is_guardrails_block
+from .token_cache import validate_token
+
+__all__ = [
+    "Level",
+    "API_BASE_URL",
+    "start_backend_monitor",
+    "wait_for_backend",
+    "stream_response",
+    "cached_response",
+    "gateway",
+    "llm_ainvoke",
+    "llm_call",
+    "llm_slot",
+    "is_guardrails_block",
+    "validate_token",
+    "sidebar_panel",
+    "render_chat_history",
+]
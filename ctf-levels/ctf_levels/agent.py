@@ -0,0 +1,117 @@
+# agent.py - Tool-calling loop for the agent level (level 5)
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+AGENT_MAX_ITERATIONS = int(os.getenv('AGENT_MAX_ITERATIONS', '3'))  # Completions per user turn, tool rounds included
+AGENT_TOOL_WORKERS = int(os.getenv('AGENT_TOOL_WORKERS', '8'))  # Threads for tool calls that may run side by side
+
+logger = logging.getLogger(__name__)
+
+# Shared by every session; only tools registered as parallel run here
+_tool_pool = ThreadPoolExecutor(max_workers=AGENT_TOOL_WORKERS, thread_name_prefix="agent-tool")
+
+
+class ToolResult:
+    """What a tool handler returns.
+
+    `content` goes back to the model as the tool message, `reply` is shown to
+    the player, and `final` says the reply already answers the turn, so no
+    follow-up completion is needed to phrase it.
+    """
+
+    __slots__ = ("content", "reply", "final")
+
+    def __init__(self, content, reply=None, final=True):
+        self.content = content
+        self.reply = reply if reply is not None else content
+        self.final = final
+
+
+class AgentExecutor:
+    """Runs one user turn: completion, tool calls, and (only if needed) another completion.
+
+    `complete(messages, tools=None)` performs a chat completion (no tools means
+    answer in text). `handlers` maps tool names to `handler(args) -> ToolResult`.
+
+    Tool calls in one response run together: handlers named in `parallel` (read
+    only, or otherwise independent) go to a thread pool, the rest run in order
+    on the script thread, and the results are reported in the order the model
+    asked for them. When every result is final the turn ends without a second
+    completion. Otherwise the tool messages are sent back for another round, at
+    most `max_iterations` completions in all; the last one is offered no tools.
+    """
+
+    def __init__(self, complete, tools, handlers, parallel=(), max_iterations=AGENT_MAX_ITERATIONS):
+        self.complete = complete
+        self.tools = tools
+        self.handlers = handlers
+        self.parallel = set(parallel)
+        self.max_iterations = max(1, max_iterations)
+
+    def _call(self, tool_call):
+        handler = self.handlers.get(tool_call.function.name)
+        if handler is None:
+            error = f"Unknown tool: {tool_call.function.name}. Available tools: {', '.join(self.handlers)}."
+            return ToolResult(error, reply=error + "\n", final=False)
+        try:
+            args = json.loads(tool_call.function.arguments or "{}")
+        except ValueError:
+            error = f"Arguments for {tool_call.function.name} were not valid JSON."
+            return ToolResult(error, reply=error + "\n", final=False)
+        return handler(args)
+
+    def _call_with_ctx(self, ctx, tool_call):
+        # Lets the handler read st.session_state from the pool thread
+        add_script_run_ctx(ctx=ctx)
+        return self._call(tool_call)
+
+    def execute(self, tool_calls):
+        """Run one response's tool calls and return their ToolResults in call order."""
+        ctx = get_script_run_ctx()
+        futures = {
+            index: _tool_pool.submit(self._call_with_ctx, ctx, tool_call)
+            for index, tool_call in enumerate(tool_calls)
+            if tool_call.function.name in self.parallel
+        }
+        results = [None if index in futures else self._call(tool_call) for index, tool_call in enumerate(tool_calls)]
+        for index, future in futures.items():
+            results[index] = future.result()
+        return results
+
+    def run(self, history, build_context):
+        """Answer the turn whose user message is last in `history`.
+
+        Returns (reply, used_tools). Tool calls and their results are appended
+        to `history`, the reply is not. build_context(history) gives the
+        messages sent to the model.
+        """
+        replies = []
+        used_tools = False
+        for iteration in range(self.max_iterations):
+            last = iteration == self.max_iterations - 1
+            tools = None if last else self.tools
+            message = self.complete(build_context(history), tools).choices[0].message
+            if not message.tool_calls:
+                if message.content:
+                    replies.append(message.content)
+                break
+
+            used_tools = True
+            results = self.execute(message.tool_calls)
+            history.append({
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [tool_call.model_dump() for tool_call in message.tool_calls]
+            })
+            for tool_call, result in zip(message.tool_calls, results):
+                history.append({"role": "tool", "content": str(result.content), "tool_call_id": tool_call.id})
+                if result.reply:
+                    replies.append(result.reply)
+            if all(result.final for result in results):
+                break
+        else:
+            logger.warning(f"Agent stopped after {self.max_iterations} completions without a final answer")
+        return "".join(replies), used_tools
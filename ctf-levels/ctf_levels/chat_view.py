@@ -0,0 +1,54 @@
+# chat_view.py - Chat history whose redraw cost stays flat as the conversation grows
+from functools import lru_cache
+import os
+import streamlit as st
+
+CHAT_EAGER_MESSAGES = int(os.getenv('CHAT_EAGER_MESSAGES', '12'))  # Latest messages drawn as chat bubbles on every rerun
+CHAT_MARKDOWN_CACHE = int(os.getenv('CHAT_MARKDOWN_CACHE', '4096'))  # Formatted messages kept for the earlier-messages block
+
+_ROLE_LABELS = {"user": "You", "assistant": "AI Bot"}
+
+
+@lru_cache(maxsize=CHAT_MARKDOWN_CACHE)
+def message_markdown(role, content):
+    """One earlier message as a section of the transcript, formatted once per message."""
+    label = _ROLE_LABELS.get(role, role.title())
+    return f"**{label}:**\n\n{content}"
+
+
+def transcript_markdown(messages):
+    """Earlier messages as one markdown block (one element instead of a bubble each)."""
+    return "\n\n---\n\n".join(
+        message_markdown(message["role"], str(message["content"])) for message in messages if message["content"]
+    )
+
+
+def render_chat_history(messages, user_avatar, ai_avatar, eager=CHAT_EAGER_MESSAGES, key="chat_history"):
+    """Draw the chat history: the last `eager` messages as chat bubbles, older ones on request.
+
+    Only the recent messages become st.chat_message elements, so a rerun at
+    turn 50 sends the browser as much as one at turn 2. Everything older sits
+    behind a toggle and is not drawn at all until the player opens it; then
+    it is a single markdown transcript built from per-message cached text.
+    The recent part starts at a user message where it can, so a turn is not
+    split between the two.
+    """
+    split = start = max(0, len(messages) - eager)
+    while 0 < split < len(messages) and messages[split]["role"] != "user":
+        split += 1
+    if split == len(messages):
+        split = start  # No user message in the tail: keep the plain cut
+
+    if split:
+        # Constant label: Streamlit derives the widget id from it, and a label
+        # that changed with every message would reset the toggle each turn
+        show_earlier = st.toggle("Show earlier messages", key=f"{key}_earlier")
+        st.caption(f"{split} earlier messages")
+        if show_earlier:
+            with st.container(border=True):
+                st.markdown(transcript_markdown(messages[:split]))
+
+    for message in messages[split:]:
+        avatar = user_avatar if message["role"] == "user" else ai_avatar
+        with st.chat_message(message["role"], avatar=avatar):
+            st.markdown(message["content"])
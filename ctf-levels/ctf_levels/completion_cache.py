@@ -0,0 +1,154 @@
+# completion_cache.py - Opt-in cache of LLM answers for the single-turn levels
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import streamlit as st
+from .streaming import stream_response
+
+# Levels 1, 2, 4 and 6 send a fixed system prompt plus one user message with no
+# history, so identical prompts ("what is the flag") get identical requests.
+# Off by default: a cached answer is only as good as the model call that made it.
+COMPLETION_CACHE = os.getenv('COMPLETION_CACHE', 'False') == 'True'  # Serve repeated single-turn prompts from cache
+COMPLETION_CACHE_SIZE = int(os.getenv('COMPLETION_CACHE_SIZE', '2048'))  # Prompts kept in the memory tier
+COMPLETION_CACHE_TTL = int(os.getenv('COMPLETION_CACHE_TTL', '3600'))  # Seconds an answer may be reused
+COMPLETION_CACHE_DB = os.getenv('COMPLETION_CACHE_DB', '')  # Optional SQLite file for a disk tier shared across restarts
+COMPLETION_CACHE_VARIANTS = int(os.getenv('COMPLETION_CACHE_VARIANTS', '1'))  # Answers sampled per prompt before serving from cache
+
+
+def completion_key(llm, system_prompt, user_prompt):
+    """Hash of everything that determines a single-turn answer."""
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+    temperature = getattr(llm, "temperature", None)
+    payload = json.dumps([model, system_prompt, user_prompt, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """LRU memory tier over an optional SQLite tier, with a TTL per prompt.
+
+    Each prompt holds a small reservoir of up to `variants` answers. Until it is
+    full, lookups miss so the model keeps producing fresh samples; after that a
+    random variant is served, so repeated prompts don't all read identically.
+    """
+
+    def __init__(self, size=COMPLETION_CACHE_SIZE, ttl=COMPLETION_CACHE_TTL, db_path=COMPLETION_CACHE_DB,
+                 variants=COMPLETION_CACHE_VARIANTS):
+        self.size = size
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> {"expires", "answers"}
+        self._stats = {"hits": 0, "misses": 0, "disk_hits": 0, "stores": 0}
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions "
+                "(key TEXT, variant INTEGER, answer TEXT, expires REAL, PRIMARY KEY (key, variant))"
+            )
+            self._db.commit()
+
+    def _load(self, key, now):
+        # Caller holds the lock
+        rows = self._db.execute(
+            "SELECT answer, expires FROM completions WHERE key = ? AND expires > ? ORDER BY variant", (key, now)
+        ).fetchall()
+        if not rows:
+            return None
+        return {"expires": min(expires for _, expires in rows), "answers": [answer for answer, _ in rows]}
+
+    def get(self, key):
+        """Return a cached answer for key, or None if the caller should ask the model."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires"] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None and self._db is not None:
+                entry = self._load(key, now)
+                if entry is not None:
+                    self._stats["disk_hits"] += 1
+                    self._insert(key, entry)
+            if entry is None or len(entry["answers"]) < self.variants:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return random.choice(entry["answers"])
+
+    def _insert(self, key, entry):
+        # Caller holds the lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def put(self, key, answer):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires"] <= now:
+                entry = {"expires": now + self.ttl, "answers": []}
+            if len(entry["answers"]) >= self.variants:
+                return
+            entry["answers"].append(answer)
+            self._insert(key, entry)
+            self._stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)",
+                    (key, len(entry["answers"]) - 1, answer, entry["expires"])
+                )
+                self._db.execute("DELETE FROM completions WHERE expires <= ?", (now,))
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache():
+    """The process-wide cache (created on first use)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CompletionCache()
+        return _cache
+
+
+def completion_cache_stats():
+    return get_completion_cache().stats() if _cache is not None else {}
+
+
+def cached_response(runnable, inputs, llm, system_prompt, user_prompt, **kwargs):
+    """stream_response() for single-turn levels, answered from the cache when COMPLETION_CACHE is on.
+
+    `llm` is the model at the end of `runnable` (they are the same object unless
+    the level pipes a prompt template into it); it only contributes to the key.
+    Errors (including guardrails blocks) propagate uncached.
+    """
+    if not COMPLETION_CACHE:
+        return stream_response(runnable, inputs, **kwargs)
+    cache = get_completion_cache()
+    key = completion_key(llm, system_prompt, user_prompt)
+    answer = cache.get(key)
+    if answer is not None:
+        st.markdown(answer)
+        return answer
+    answer = stream_response(runnable, inputs, **kwargs)
+    if answer.strip():
+        cache.put(key, answer)
+    return answer
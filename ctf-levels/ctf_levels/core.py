@@ -0,0 +1,148 @@
+# core.py - Level base class: the startup every CTF level page shares
+import functools
+import os
+import time
+import requests
+import streamlit as st
+from .chat_view import render_chat_history
+from .gateway import current_level
+from .readiness import start_backend_monitor, wait_for_backend
+from .token_cache import validate_token
+from .theme import DEFAULT_CSS, GUARDRAILS_CSS
+
+API_BASE_URL = os.getenv('API_BASE_URL', 'https://ai-ctf.xc.edgecnf.com')
+TOKEN_PARAM_ATTEMPTS = int(os.getenv('TOKEN_PARAM_ATTEMPTS', '3'))  # Reruns to wait for ?token=&username= before denying
+TOKEN_VALIDATE_TIMEOUT = float(os.getenv('TOKEN_VALIDATE_TIMEOUT', '10'))  # Seconds for /api/validate-token
+
+USER_AVATAR = "user.png"  # Ensure this file exists in /app
+AI_AVATAR = "ai.png"      # Ensure this file exists in /app
+
+# Probe the backend (and warm its DNS) from a background thread, once per process
+start_backend_monitor(API_BASE_URL)
+
+
+class Level:
+    """One CTF level page.
+
+    Subclasses declare the level's number, flag and texts as class attributes
+    and implement level_logic (the chat handler) and render_info (the body of
+    the collapsible info panel). run() does everything else: backend gate,
+    token check, page config, theme, info panel and chat history.
+    Titles may use {level}, which is filled with the level number.
+    """
+
+    number = 0
+    guardrails = False
+    flag = None
+
+    title = "CTF Level {level}"
+    page_title = "CTF Chatbot - Level {level}"
+    page_icon = "🏴‍☠️"
+    info_label = "📌 Flag Info"
+    extra_css = ""
+
+    # None starts the chat empty; levels that render their own history set history_in_page = False
+    welcome_message = "Welcome to AI Bot! I am your smart AI assistant. How can I assist you today?"
+    history_in_page = True
+
+    user_avatar = USER_AVATAR
+    ai_avatar = AI_AVATAR
+
+    @property
+    def token_level(self):
+        # Guardrails tokens are issued for "guard-N"
+        return f"guard-{self.number}" if self.guardrails else self.number
+
+    def credentials(self):
+        """Return (username, token) from the query string, or stop the page if they never arrive."""
+        token = st.query_params.get("token") or None
+        username = st.query_params.get("username") or None
+        if token is not None and username is not None:
+            st.session_state.pop("_credential_attempts", None)
+            return username, token
+
+        # Query params can lag the first render; give them a few reruns before denying
+        attempts = st.session_state.get("_credential_attempts", 0) + 1
+        st.session_state["_credential_attempts"] = attempts
+        if attempts < TOKEN_PARAM_ATTEMPTS:
+            time.sleep(0.5)
+            st.rerun()
+        st.error("Access denied: Missing token.")
+        st.stop()
+
+    def authorize(self, username, token):
+        """Stop the page unless the backend accepts the level token."""
+        try:
+            if not validate_token(API_BASE_URL, username, self.token_level, token, timeout=TOKEN_VALIDATE_TIMEOUT):
+                st.error(f"Access denied: Invalid {'guardrails ' if self.guardrails else ''}token.")
+                st.stop()
+        except requests.exceptions.Timeout:
+            st.error("Token validation timed out. Please check your internet connection and try again.")
+            st.stop()
+        except requests.exceptions.ConnectionError as e:
+            st.error(f"Connection error during token validation: {str(e)}")
+            st.stop()
+        except requests.RequestException as e:
+            st.error(f"Failed to validate token: {str(e)}")
+            st.stop()
+
+    def render_css(self):
+        css = GUARDRAILS_CSS if self.guardrails else DEFAULT_CSS
+        st.markdown(css + self.extra_css, unsafe_allow_html=True)
+
+    def render_info(self):
+        """Body of the collapsible info panel (scenario, challenge, progress)."""
+
+    def render_history(self):
+        render_chat_history(st.session_state.messages, self.user_avatar, self.ai_avatar)
+
+    def level_logic(self, level, user_avatar, ai_avatar):
+        """Level-specific chat handling."""
+        raise NotImplementedError
+
+    def fragment(self, func):
+        """st.fragment for a part of level_logic that should rerun on its own (e.g. the chat).
+
+        Widgets inside it rerun only that function, not the page: no CSS,
+        info panel or sidebar. Fragment reruns skip run(), so the gateway level
+        is set again here.
+        """
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            current_level.set(self.token_level)
+            return func(*args, **kwargs)
+        return st.fragment(body)
+
+    def run(self):
+        level = self.number
+        wait_for_backend(API_BASE_URL)
+        username, token = self.credentials()
+
+        # Store username in session state if not already set, using the full value
+        if 'username' not in st.session_state:
+            st.session_state.username = username
+
+        self.authorize(username, token)
+
+        # --- PAGE CONFIG ---
+        st.set_page_config(page_title=self.page_title.format(level=level), page_icon=self.page_icon, layout="wide")
+        st.title(self.title.format(level=level))
+        self.render_css()
+
+        # --- COLLAPSIBLE INFO PANEL ---
+        with st.expander(self.info_label, expanded=False):
+            self.render_info()
+
+        # --- DEMO CHAT ---
+        if self.history_in_page:
+            if "messages" not in st.session_state:
+                st.session_state.messages = (
+                    [{"role": "assistant", "content": self.welcome_message}] if self.welcome_message else []
+                )
+            self.render_history()
+
+        # LLM calls made by this page queue under its level in the gateway
+        current_level.set(self.token_level)
+
+        # Call level-specific logic with the level and avatar parameters
+        self.level_logic(level, self.user_avatar, self.ai_avatar)
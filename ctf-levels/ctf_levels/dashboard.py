@@ -0,0 +1,21 @@
+# dashboard.py - Sidebar panels that redraw in place instead of rerunning the page
+import streamlit as st
+
+
+def sidebar_panel(render):
+    """Draw render() into its own sidebar slot; returns refresh(), which redraws just that slot.
+
+    Call refresh() whenever the state behind the panel changes, including from
+    inside a chat fragment: the slot is replaced, not appended to, so the panel
+    stays current without st.rerun(). render() must not create widgets (a
+    fragment may not place widgets outside itself); keep buttons and radios
+    next to the panel instead.
+    """
+    slot = st.sidebar.empty()
+
+    def refresh(*_):
+        with slot.container():
+            render()
+
+    refresh()
+    return refresh
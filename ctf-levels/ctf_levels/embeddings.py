@@ -0,0 +1,164 @@
+# embeddings.py - Batched OpenAI-compatible embeddings for the RAG levels
+from array import array
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import openai
+from langchain_openai import OpenAIEmbeddings
+from config import get_openai_client, OPENAI_BASE_URL, API_KEY, USE_API_KEY_FOR_EMBEDDINGS
+
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))  # Texts sent per embeddings.create call
+EMBEDDING_RETRIES = int(os.getenv('EMBEDDING_RETRIES', '3'))  # Attempts per batch before giving up
+EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '4096'))  # Vectors kept in the memory tier
+EMBEDDING_CACHE_DB = os.getenv('EMBEDDING_CACHE_DB', '')  # Optional SQLite file for a disk tier shared across restarts
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: memory LRU over an optional SQLite tier.
+
+    Entries are keyed by (model, sha256(text)), so switching EMBEDDING_MODEL
+    never serves vectors from another model's space.
+    """
+
+    def __init__(self, size=EMBEDDING_CACHE_SIZE, db_path=EMBEDDING_CACHE_DB):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (model, digest) -> list of floats
+        self._stats = {"hits": 0, "misses": 0, "disk_hits": 0}
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (model TEXT, digest TEXT, vector BLOB, PRIMARY KEY (model, digest))"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(model, text):
+        return (model, hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+    def _insert(self, key, vector):
+        # Caller holds the lock
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def get(self, model, text):
+        key = self.key(model, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND digest = ?", key
+                ).fetchone()
+                if row is not None:
+                    vector = array("d", row[0]).tolist()
+                    self._insert(key, vector)
+                    self._stats["disk_hits"] += 1
+            self._stats["hits" if vector is not None else "misses"] += 1
+            return vector
+
+    def put(self, model, text, vector):
+        key = self.key(model, text)
+        vector = list(vector)
+        with self._lock:
+            self._insert(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", key + (array("d", vector).tobytes(),)
+                )
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# One cache for every session and level in the process
+embedding_cache = EmbeddingCache()
+
+
+def _embedding_client():
+    # One pooled client per process (config registry), not one per text
+    return get_openai_client(
+        base_url=OPENAI_BASE_URL,
+        api_key=API_KEY if USE_API_KEY_FOR_EMBEDDINGS else None,
+        default_headers={"Content-Type": "application/json"}
+    )
+
+
+class CustomOpenAIEmbeddings(OpenAIEmbeddings):
+    """OpenAIEmbeddings that sends plain strings instead of tiktoken arrays.
+
+    The inference server (Ollama's OpenAI API) only accepts string input, so the
+    texts go out as lists of strings, EMBEDDING_BATCH_SIZE at a time. Each batch
+    is retried with backoff; a batch the server rejects outright is retried one
+    text at a time. Results come back in input order. Every vector goes through
+    the process-wide embedding_cache, so repeats never reach the server.
+    """
+
+    def _create(self, client, inputs):
+        response = client.embeddings.create(input=inputs, model=self.model)
+        # The API returns an index per item; don't rely on response order
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def _embed_batch(self, client, batch):
+        """Embed a list of texts, or one text sent as a plain string; returns a list of vectors."""
+        single = isinstance(batch, str)
+        for attempt in range(EMBEDDING_RETRIES):
+            try:
+                return self._create(client, batch)
+            except openai.BadRequestError:
+                if single:
+                    raise
+                # Server doesn't take list input (or one text is bad): send each text as a plain string
+                return [self._embed_batch(client, text)[0] for text in batch]
+            except Exception as e:
+                if attempt == EMBEDDING_RETRIES - 1:
+                    count, first = (1, batch) if single else (len(batch), batch[0])
+                    logger.error(f"Error embedding batch of {count} starting '{first[:50]}...': {str(e)}")
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+    def embed_documents(self, texts, chunk_size=None):
+        texts = list(texts)
+        embeddings = [embedding_cache.get(self.model, text) for text in texts]
+        # Only the cache misses (deduplicated) go to the server
+        pending = list(dict.fromkeys(text for text, vector in zip(texts, embeddings) if vector is None))
+        if pending:
+            size = chunk_size or EMBEDDING_BATCH_SIZE
+            client = _embedding_client()
+            fresh = {}
+            for start in range(0, len(pending), size):
+                batch = pending[start:start + size]
+                for text, vector in zip(batch, self._embed_batch(client, batch)):
+                    embedding_cache.put(self.model, text, vector)
+                    fresh[text] = vector
+            embeddings = [vector if vector is not None else fresh[text] for text, vector in zip(texts, embeddings)]
+        return embeddings
+
+    def embed_query(self, text):
+        vector = embedding_cache.get(self.model, text)
+        if vector is not None:
+            return vector
+        try:
+            # Single string input: no batching, no list wrapping
+            response = _embedding_client().embeddings.create(input=text, model=self.model)
+        except Exception as e:
+            logger.error(f"Error embedding query '{text[:50]}...': {str(e)}")
+            raise
+        vector = response.data[0].embedding
+        embedding_cache.put(self.model, text, vector)
+        return vector
@@ -0,0 +1,236 @@
+# fetcher.py - Bounded, cached URL fetching for level 6's page summaries
+from collections import OrderedDict
+from html.parser import HTMLParser
+import codecs
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+FETCH_TIMEOUT = float(os.getenv('FETCH_TIMEOUT', '5'))  # Seconds to connect, and between bytes read
+FETCH_DEADLINE = float(os.getenv('FETCH_DEADLINE', '10'))  # Seconds for the whole download before it is cut off
+FETCH_MAX_BYTES = int(os.getenv('FETCH_MAX_BYTES', str(1024 * 1024)))  # Bytes read per page at most; the rest is dropped
+FETCH_POOL_SIZE = int(os.getenv('FETCH_POOL_SIZE', '16'))  # Keep-alive connections per host in the shared session
+FETCH_CACHE_TTL = int(os.getenv('FETCH_CACHE_TTL', '300'))  # Seconds a fetched page is reused
+FETCH_CACHE_SIZE = int(os.getenv('FETCH_CACHE_SIZE', '256'))  # Pages kept in the process cache
+FETCH_CONTENT_TYPES = os.getenv(
+    'FETCH_CONTENT_TYPES', 'text/,application/json,application/xml,application/xhtml+xml'
+).split(',')  # Content-type prefixes worth summarizing; anything else is refused before its body is read
+
+_CHUNK_SIZE = 16 * 1024
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class FetchError(requests.RequestException):
+    """The page was refused (content type) or could not be read."""
+
+
+class _TextExtractor(HTMLParser):
+    """Visible text of an HTML page, plus its comments.
+
+    Script and style bodies are dropped. Comments are kept: instructions hidden
+    in them are part of what level 6 is about.
+    """
+
+    _SKIP = {"script", "style", "noscript", "template"}
+    _BLOCK = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP and self._skipping:
+            self._skipping -= 1
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+    def handle_comment(self, data):
+        self.parts.append(f"\n{data}\n")
+
+    def text(self):
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def html_to_text(html):
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """The process-wide requests.Session, so repeat fetches reuse keep-alive connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=FETCH_POOL_SIZE, pool_maxsize=FETCH_POOL_SIZE, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _allowed(content_type):
+    return any(content_type.startswith(prefix.strip()) for prefix in FETCH_CONTENT_TYPES if prefix.strip())
+
+
+def _shutdown(raw):
+    try:
+        raw.shutdown()
+    except (ValueError, RuntimeError, OSError):
+        pass  # Already finished or released: nothing left to unblock
+
+
+def _read_body(response, deadline):
+    """Yield raw body pieces until FETCH_MAX_BYTES, EOF or the wall-clock deadline.
+
+    FETCH_TIMEOUT bounds each socket read, not the download, so a server that
+    drips a byte at a time could hold a read open indefinitely. read1() returns
+    whatever has arrived, and a timer shuts the socket down at the deadline to
+    wake a read still blocked then. A body cut off that way (or broken off by
+    the server) ends the pieces; what arrived before is kept.
+    """
+    raw = response.raw
+    watchdog = threading.Timer(max(0.0, deadline - time.monotonic()), _shutdown, (raw,))
+    watchdog.daemon = True
+    watchdog.start()
+    try:
+        received = 0
+        while received < FETCH_MAX_BYTES and time.monotonic() < deadline:
+            try:
+                chunk = raw.read1(min(_CHUNK_SIZE, FETCH_MAX_BYTES - received), decode_content=True)
+            except (ProtocolError, ReadTimeoutError, OSError):
+                if not received:
+                    raise
+                break
+            if not chunk:
+                break
+            received += len(chunk)
+            yield chunk
+    finally:
+        watchdog.cancel()
+
+
+def _download(url):
+    """GET url and return its text, reading at most FETCH_MAX_BYTES for at most FETCH_DEADLINE seconds."""
+    deadline = time.monotonic() + FETCH_DEADLINE
+    with get_session().get(url, timeout=FETCH_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type and not _allowed(content_type):
+            raise FetchError(f"Unsupported content type: {content_type}")
+
+        # Decode incrementally so a multi-byte character split across chunks survives
+        encoding = get_encoding_from_headers(response.headers) or "utf-8"
+        try:
+            decoder = codecs.getincrementaldecoder(encoding)("replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        try:
+            parts = [decoder.decode(chunk) for chunk in _read_body(response, deadline)]
+        except (ProtocolError, ReadTimeoutError, OSError) as e:
+            raise FetchError(f"Could not read {url}: {str(e)}") from e
+        parts.append(decoder.decode(b"", final=True))
+
+    text = "".join(parts)
+    if content_type in _HTML_TYPES or (not content_type and "<html" in text[:1024].lower()):
+        text = html_to_text(text)
+    return text
+
+
+class FetchCache:
+    """TTL + LRU cache of fetched page text, keyed by URL.
+
+    Concurrent misses for the same URL wait for the first fetch instead of all
+    downloading it. Errors are not cached.
+    """
+
+    def __init__(self, size=FETCH_CACHE_SIZE, ttl=FETCH_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # url -> (expires, text)
+        self._inflight = {}  # url -> lock held by the session fetching it
+        self._stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    def _lookup(self, url, now):
+        # Caller holds the lock
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        if now >= entry[0]:
+            del self._entries[url]
+            return None
+        self._entries.move_to_end(url)
+        return entry[1]
+
+    def fetch(self, url):
+        with self._lock:
+            text = self._lookup(url, time.time())
+            if text is not None:
+                self._stats["hits"] += 1
+                return text
+            fetch_lock = self._inflight.setdefault(url, threading.Lock())
+
+        with fetch_lock:
+            with self._lock:
+                # Another session may have fetched it while we waited
+                text = self._lookup(url, time.time())
+                if text is not None:
+                    self._stats["hits"] += 1
+                    return text
+                self._stats["misses"] += 1
+            try:
+                text = _download(url)
+            except Exception:
+                with self._lock:
+                    self._stats["errors"] += 1
+                    self._inflight.pop(url, None)
+                raise
+            with self._lock:
+                self._entries[url] = (time.time() + self.ttl, text)
+                self._entries.move_to_end(url)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+                self._inflight.pop(url, None)
+            return text
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# One cache for every session in the process: players tend to share the same pages
+fetch_cache = FetchCache()
+
+
+def fetch_text(url):
+    """Text of the page at url (HTML reduced to its text), served from cache within FETCH_CACHE_TTL.
+
+    Raises requests.RequestException (FetchError for refused content types).
+    """
+    return fetch_cache.fetch(url)
@@ -0,0 +1,197 @@
+# gateway.py - Process-wide LLM concurrency gate with fair per-level queues
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import itertools
+import threading
+import time
+import streamlit as st
+from config import LLM_MAX_IN_FLIGHT, LLM_QUEUE_TIMEOUT
+
+# Level of the page running in this script thread; set by Level.run()
+current_level = ContextVar("current_level", default=None)
+
+
+class _Ticket:
+    __slots__ = ("id", "level", "granted")
+
+    def __init__(self, ticket_id, level):
+        self.id = ticket_id
+        self.level = level
+        self.granted = False
+
+
+class LLMGateway:
+    """Bounded gate in front of the inference server.
+
+    At most `max_in_flight` LLM calls run at once. Waiting calls queue FIFO per
+    level, and free slots are handed to the levels round-robin, so a burst on
+    one level cannot starve the others. Async calls (ainvoke, AsyncOpenAI) run
+    on one background event loop, which also owns the shared async HTTP pool.
+    """
+
+    def __init__(self, max_in_flight=LLM_MAX_IN_FLIGHT, queue_timeout=LLM_QUEUE_TIMEOUT):
+        self.max_in_flight = max(1, max_in_flight)
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # level -> deque of waiting tickets, in round-robin order
+        self._ids = itertools.count()
+        self._in_flight = 0
+        self._stats = {"granted": 0, "queued": 0, "timeouts": 0, "max_wait": 0.0}
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    # ---------------- Slots ----------------
+    def _grant(self):
+        # Caller holds the condition
+        granted = False
+        while self._in_flight < self.max_in_flight and self._queues:
+            level, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            # Rotate: this level goes to the back of the line for the next slot
+            del self._queues[level]
+            if queue:
+                self._queues[level] = queue
+            ticket.granted = True
+            self._in_flight += 1
+            self._stats["granted"] += 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def position(self, ticket):
+        """1-based place of a waiting ticket in its level's queue (0 once granted)."""
+        with self._cond:
+            if ticket.granted:
+                return 0
+            queue = self._queues.get(ticket.level, ())
+            return next((i + 1 for i, t in enumerate(queue) if t is ticket), 0)
+
+    def acquire(self, level=None, on_wait=None):
+        """Block until a slot is free; on_wait(position, waiting) is called while queued."""
+        ticket = _Ticket(next(self._ids), level)
+        started = time.monotonic()
+        with self._cond:
+            self._queues.setdefault(level, deque()).append(ticket)
+            self._grant()
+            if not ticket.granted:
+                self._stats["queued"] += 1
+            try:
+                while not ticket.granted:
+                    waited = time.monotonic() - started
+                    if waited >= self.queue_timeout:
+                        self._stats["timeouts"] += 1
+                        raise TimeoutError("LLM queue timeout: the inference server is busy, please try again")
+                    if on_wait is not None:
+                        waiting = sum(len(q) for q in self._queues.values())
+                        position = next(i + 1 for i, t in enumerate(self._queues[level]) if t is ticket)
+                        self._cond.release()
+                        try:
+                            on_wait(position, waiting)
+                        finally:
+                            self._cond.acquire()
+                        if ticket.granted:
+                            break
+                    self._cond.wait(min(0.5, self.queue_timeout - waited))
+            except BaseException:
+                # Timeout, or on_wait raised (Streamlit stops or reruns the script
+                # while the player waits): nobody will release this ticket later
+                self._withdraw(ticket)
+                raise
+            self._stats["max_wait"] = max(self._stats["max_wait"], time.monotonic() - started)
+        return ticket
+
+    def _withdraw(self, ticket):
+        # Caller holds the condition. Drops a waiting ticket, or frees the slot
+        # it was granted while its owner was not looking.
+        if ticket.granted:
+            self._release(ticket)
+            return
+        queue = self._queues.get(ticket.level)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.level]
+
+    def _release(self, ticket):
+        # Caller holds the condition
+        if ticket.granted:
+            ticket.granted = False
+            self._in_flight -= 1
+            self._grant()
+
+    def release(self, ticket):
+        with self._cond:
+            self._release(ticket)
+
+    @contextmanager
+    def slot(self, level=None, on_wait=None):
+        ticket = self.acquire(level if level is not None else current_level.get(), on_wait)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    # ---------------- Async calls ----------------
+    def _event_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-gateway-loop", daemon=True).start()
+            return self._loop
+
+    def run(self, coro_factory, level=None, on_wait=None):
+        """Run coro_factory() on the gateway loop once a slot is free and return its result."""
+        with self.slot(level, on_wait):
+            future = asyncio.run_coroutine_threadsafe(coro_factory(), self._event_loop())
+            return future.result()
+
+    def ainvoke(self, runnable, inputs, level=None, on_wait=None, **kwargs):
+        """runnable.ainvoke(inputs) behind the gate."""
+        return self.run(lambda: runnable.ainvoke(inputs, **kwargs), level, on_wait)
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                self._stats,
+                in_flight=self._in_flight,
+                max_in_flight=self.max_in_flight,
+                waiting={str(level): len(queue) for level, queue in self._queues.items()}
+            )
+
+
+gateway = LLMGateway()
+
+
+@contextmanager
+def queue_notice():
+    """on_wait callback that shows the player's place in the queue in the current chat message."""
+    notice = st.empty()
+
+    def show(position, waiting):
+        notice.info(f"⏳ The AI is busy right now — you are #{position} in line for this level ({waiting} waiting in total).")
+
+    try:
+        yield show
+    finally:
+        notice.empty()
+
+
+@contextmanager
+def llm_slot(level=None):
+    """gateway.slot() with queue-position feedback rendered in the chat."""
+    with queue_notice() as show, gateway.slot(level, show):
+        yield
+
+
+def llm_call(coro_factory, level=None):
+    """gateway.run() with queue-position feedback rendered in the chat."""
+    with queue_notice() as show:
+        return gateway.run(coro_factory, level, show)
+
+
+def llm_ainvoke(runnable, inputs, level=None, **kwargs):
+    """gateway.ainvoke() with queue-position feedback rendered in the chat."""
+    with queue_notice() as show:
+        return gateway.ainvoke(runnable, inputs, level, show, **kwargs)
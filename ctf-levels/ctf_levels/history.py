@@ -0,0 +1,115 @@
+# history.py - Compact chat history with tool calls, for the agent level (level 5)
+import os
+
+HISTORY_TOOL_DEPTH = int(os.getenv('HISTORY_TOOL_DEPTH', '2'))  # Recent user turns whose tool calls and results are kept
+
+
+class ToolCallRecord:
+    """The three fields of a tool call the API needs back: id, function name, JSON arguments."""
+
+    __slots__ = ("id", "name", "arguments")
+
+    def __init__(self, id, name, arguments):
+        self.id = id
+        self.name = name
+        self.arguments = arguments
+
+    @classmethod
+    def from_api(cls, tool_call):
+        # OpenAI SDK object or its model_dump() dict
+        if isinstance(tool_call, dict):
+            function = tool_call["function"]
+            return cls(tool_call["id"], function["name"], function.get("arguments") or "{}")
+        return cls(tool_call.id, tool_call.function.name, tool_call.function.arguments or "{}")
+
+    def to_dict(self):
+        return {"id": self.id, "type": "function", "function": {"name": self.name, "arguments": self.arguments}}
+
+
+class ChatMessage:
+    """One history entry. Reads like the role/content dict it replaces (message["role"],
+    message.get("tool_calls")) and only becomes a dict again in to_dict()."""
+
+    __slots__ = ("role", "content", "tool_calls", "tool_call_id")
+
+    def __init__(self, role, content=None, tool_calls=None, tool_call_id=None):
+        self.role = role
+        self.content = content
+        self.tool_calls = tuple(ToolCallRecord.from_api(call) for call in tool_calls) if tool_calls else None
+        self.tool_call_id = tool_call_id
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def to_dict(self):
+        message = {"role": self.role, "content": self.content}
+        if self.tool_calls:
+            message["tool_calls"] = [call.to_dict() for call in self.tool_calls]
+        if self.tool_call_id is not None:
+            message["tool_call_id"] = self.tool_call_id
+        return message
+
+
+class ChatHistory:
+    """List-like chat history that stores ChatMessage records.
+
+    append()/insert() take the usual message dicts. Tool exchanges (the
+    assistant message carrying tool calls plus the tool results) are only
+    needed while the model can still act on them; prune_tool_exchanges() drops
+    them from user turns older than the last `depth`, leaving the user
+    message and the final reply that reported the outcome.
+    """
+
+    __slots__ = ("_messages",)
+
+    def __init__(self, messages=()):
+        self._messages = [self._record(message) for message in messages]
+
+    @staticmethod
+    def _record(message):
+        if isinstance(message, ChatMessage):
+            return message
+        return ChatMessage(message["role"], message.get("content"), message.get("tool_calls"), message.get("tool_call_id"))
+
+    def append(self, message):
+        self._messages.append(self._record(message))
+
+    def insert(self, index, message):
+        self._messages.insert(index, self._record(message))
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __bool__(self):
+        return bool(self._messages)
+
+    def prune_tool_exchanges(self, depth=HISTORY_TOOL_DEPTH):
+        """Drop resolved tool calls and results outside the last `depth` user turns; returns how many went."""
+        user_turns = [i for i, message in enumerate(self._messages) if message.role == "user"]
+        if len(user_turns) <= depth:
+            return 0
+        cutoff = user_turns[len(user_turns) - depth] if depth > 0 else len(self._messages)
+        kept = [
+            message for index, message in enumerate(self._messages)
+            if index >= cutoff or not (message.role == "tool" or message.tool_calls)
+        ]
+        removed = len(self._messages) - len(kept)
+        self._messages = kept
+        return removed
+
+
+def serialize(messages):
+    """Message dicts for the API request, built only when the request is sent."""
+    return [message.to_dict() if isinstance(message, ChatMessage) else message for message in messages]
@@ -0,0 +1,68 @@
+# intent.py - Prompt routing and SQL guard for level 8, compiled once per process
+from functools import lru_cache
+import os
+import re
+
+ROUTE_CACHE_SIZE = int(os.getenv('ROUTE_CACHE_SIZE', '4096'))  # Normalized prompts whose routing decision is kept
+
+DATABASE = "database"
+CHITCHAT = "chitchat"
+CHAT = "chat"
+
+DATABASE_PATTERN = re.compile(r"\b(user|users|database|dump|list|show|query|sql|select|from)\b", re.I)
+SELECT_PATTERN = re.compile(r"^\s*SELECT\s+", re.I)
+SELECT_USERS_PATTERN = re.compile(r"^\s*SELECT\s+.*\s+FROM\s+users\b", re.I)
+INJECTION_PATTERN = re.compile(r"UNION|;.*--|/\*|\*/", re.I)
+LIMIT_PATTERN = re.compile(r"\s*LIMIT\s+\d+\s*;?|;?$", re.I)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING = re.compile(r"[\s!?.,~]+$")
+
+# Small talk answered without a model call; keys are normalized prompts
+CHITCHAT_REPLIES = {
+    "hi": "Hey there! I'm Bank AI Bot. How can I help you today?",
+    "hello": "Hello! I'm Bank AI Bot, ready to help you!",
+    "hey": "Hey! What can I do for you today?",
+    "good morning": "Good morning! How can I help you today?",
+    "good afternoon": "Good afternoon! How can I help you today?",
+    "good evening": "Good evening! How can I help you today?",
+    "how are you": "Hey there! I'm doing great, ready to help you!",
+    "how are you doing": "I'm doing great, thanks for asking! How can I help?",
+    "thanks": "You're welcome! Anything else I can help with?",
+    "thank you": "You're welcome! Anything else I can help with?",
+    "bye": "Goodbye! Have a great day!",
+    "goodbye": "Goodbye! Have a great day!",
+    "who are you": "I'm Bank AI Bot, a friendly smart AI assistant. Ask me anything!",
+}
+
+
+def normalize(prompt):
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return _TRAILING.sub("", _WHITESPACE.sub(" ", prompt.strip().lower()))
+
+
+@lru_cache(maxsize=ROUTE_CACHE_SIZE)
+def _route(normalized):
+    if DATABASE_PATTERN.search(normalized):
+        return DATABASE, None
+    reply = CHITCHAT_REPLIES.get(normalized)
+    if reply is not None:
+        return CHITCHAT, reply
+    return CHAT, None
+
+
+def route(prompt):
+    """Return (intent, canned_reply): DATABASE goes to SQL generation, CHITCHAT
+    carries its templated reply, CHAT goes to the conversational model."""
+    return _route(normalize(prompt))
+
+
+def enforce_select_limit_one(sql):
+    """Allow SELECT only, and cap plain `SELECT ... FROM users` queries at one row."""
+    if not SELECT_PATTERN.match(sql):
+        raise ValueError("Only SELECT queries are allowed.")
+    if SELECT_USERS_PATTERN.match(sql):
+        if not INJECTION_PATTERN.search(sql):
+            sql = LIMIT_PATTERN.sub("", sql).strip()
+            sql = f"{sql} LIMIT 1;"
+    return sql
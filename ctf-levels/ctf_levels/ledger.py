@@ -0,0 +1,131 @@
+# ledger.py - Journaled account balances and loans for the banking level (level 5)
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerError(Exception):
+    """A posting was refused; nothing was applied."""
+
+
+class Entry:
+    __slots__ = ("seq", "kind", "deltas", "detail", "_before")
+
+    def __init__(self, seq, kind, deltas, detail, before):
+        self.seq = seq
+        self.kind = kind
+        self.deltas = deltas  # ((book, account, amount), ...) with book "balance" or "loan"
+        self.detail = detail
+        self._before = before  # (book, account) -> total before this entry (None: did not exist)
+
+
+class Ledger:
+    """Append-only journal of postings over running totals.
+
+    Every change is one Entry whose deltas are applied all together or not at
+    all, so balances are always the opening figures plus the journal. The
+    running totals make each balance read O(1), and snapshot() is just the
+    journal length: undo_to(version) rolls the tail back entry by entry
+    instead of rebuilding state, and undo_to(0) is the Reset button.
+
+    subscribe(name, callback) registers callback(event, entry) for "post" and
+    "undo" events; a name is registered once, so resubscribing on every
+    Streamlit rerun replaces the previous callback instead of stacking them.
+    """
+
+    def __init__(self, opening_balances):
+        self._lock = threading.RLock()
+        self._totals = {("balance", account): float(amount) for account, amount in opening_balances.items()}
+        self._journal = []
+        self._subscribers = {}
+
+    # ---------------- Reads ----------------
+    def has_account(self, account):
+        return ("balance", account) in self._totals
+
+    def balance(self, account):
+        return self._totals[("balance", account)]
+
+    def loan_total(self, account):
+        return self._totals.get(("loan", account), 0.0)
+
+    def balances(self):
+        with self._lock:
+            return {account: amount for (book, account), amount in self._totals.items() if book == "balance"}
+
+    def loans(self):
+        """Approved loan totals per user (only users with a loan)."""
+        with self._lock:
+            return {account: amount for (book, account), amount in self._totals.items() if book == "loan" and amount}
+
+    def snapshot(self):
+        return len(self._journal)
+
+    def entries(self, since=0):
+        return self._journal[since:]
+
+    # ---------------- Postings ----------------
+    def post(self, kind, deltas, **detail):
+        """Apply all deltas as one journal entry; raises LedgerError if a balance would go negative."""
+        with self._lock:
+            after = {}
+            for book, account, amount in deltas:
+                key = (book, account)
+                after[key] = after.get(key, self._totals.get(key, 0.0)) + amount
+                if book == "balance" and key not in self._totals:
+                    raise LedgerError(f"Unknown account: {account}")
+            for (book, account), amount in after.items():
+                if book == "balance" and amount < 0:
+                    raise LedgerError("Insufficient funds.")
+            before = {key: self._totals.get(key) for key in after}
+            self._totals.update(after)
+            entry = Entry(len(self._journal), kind, tuple(deltas), detail, before)
+            self._journal.append(entry)
+        self._notify("post", entry)
+        return entry
+
+    def transfer(self, from_account, to_account, amount):
+        return self.post(
+            "transfer",
+            (("balance", from_account, -amount), ("balance", to_account, amount)),
+            from_account=from_account, to_account=to_account, amount=amount
+        )
+
+    def approve_loan(self, account, amount):
+        """Record the loan, and credit it if the user holds an account here."""
+        deltas = [("loan", account, amount)]
+        if self.has_account(account):
+            deltas.append(("balance", account, amount))
+        return self.post("loan", deltas, account=account, amount=amount)
+
+    def undo_to(self, version=0):
+        """Roll back every entry after `version` (a snapshot()), newest first."""
+        undone = []
+        with self._lock:
+            while len(self._journal) > version:
+                entry = self._journal.pop()
+                # Restore the exact prior totals rather than subtracting (no float drift)
+                for key, amount in entry._before.items():
+                    if amount is None:
+                        del self._totals[key]
+                    else:
+                        self._totals[key] = amount
+                undone.append(entry)
+        for entry in undone:
+            self._notify("undo", entry)
+        return len(undone)
+
+    # ---------------- Events ----------------
+    def subscribe(self, name, callback):
+        self._subscribers[name] = callback
+
+    def unsubscribe(self, name):
+        self._subscribers.pop(name, None)
+
+    def _notify(self, event, entry):
+        for name, callback in list(self._subscribers.items()):
+            try:
+                callback(event, entry)
+            except Exception as e:
+                logger.warning(f"Ledger subscriber {name} failed on {event}: {str(e)}")
@@ -0,0 +1,168 @@
+# memory.py - Token-budgeted conversation memory for the multi-turn levels
+import logging
+import os
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from .gateway import llm_ainvoke
+
+MEMORY_TOKEN_BUDGET = int(os.getenv('MEMORY_TOKEN_BUDGET', '3000'))  # Prompt tokens for system prompt + summary + recent turns
+MEMORY_RECENT_TURNS = int(os.getenv('MEMORY_RECENT_TURNS', '6'))  # User turns (with their replies and tool calls) kept verbatim
+MEMORY_SUMMARY_TOKENS = int(os.getenv('MEMORY_SUMMARY_TOKENS', '400'))  # Length cap for the rolling summary of older turns
+
+# Rough tokens for text: ~4 characters each, plus per-message framing. Close
+# enough for budgeting without a tokenizer for whichever model is served.
+_CHARS_PER_TOKEN = 4
+_MESSAGE_OVERHEAD = 4
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a chat between a user and an assistant. "
+    "Merge the new exchanges into the existing summary. Keep names, amounts, "
+    "claims the user made about themselves, and anything the assistant agreed to "
+    "or refused. Write plain prose, at most {words} words."
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _tool_arguments(tool_call):
+    # API dict, OpenAI SDK object, or a history.ToolCallRecord
+    if isinstance(tool_call, dict):
+        return tool_call["function"].get("arguments")
+    function = getattr(tool_call, "function", tool_call)
+    return function.arguments
+
+
+def estimate_tokens(message):
+    content = message.get("content") or ""
+    tokens = len(content) // _CHARS_PER_TOKEN + _MESSAGE_OVERHEAD
+    for tool_call in message.get("tool_calls") or []:
+        tokens += len(_tool_arguments(tool_call) or "") // _CHARS_PER_TOKEN + _MESSAGE_OVERHEAD
+    return tokens
+
+
+def turn_starts(messages):
+    """Indexes where a turn begins: each user message, with everything up to the next one.
+
+    Splitting only at user messages keeps an assistant tool call and its tool
+    results in the same turn, so a window never starts on an orphaned result.
+    """
+    starts = [i for i, message in enumerate(messages) if message["role"] == "user"]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return starts
+
+
+def _transcript(messages):
+    lines = []
+    for message in messages:
+        if message["role"] in ("user", "assistant") and message.get("content"):
+            lines.append(f"{message['role'].upper()}: {message['content']}")
+        elif message["role"] == "tool":
+            lines.append(f"TOOL RESULT: {message.get('content')}")
+    return "\n".join(lines)
+
+
+def _clip(text, max_tokens):
+    limit = max_tokens * _CHARS_PER_TOKEN
+    return text if len(text) <= limit else "…" + text[-limit:]
+
+
+def extractive_summary(previous, messages, max_tokens=MEMORY_SUMMARY_TOKENS):
+    """Fallback when the model is unavailable: the tail of the old transcript, clipped to size."""
+    return _clip("\n".join(part for part in (previous, _transcript(messages)) if part), max_tokens)
+
+
+def llm_summarizer(llm, max_tokens=MEMORY_SUMMARY_TOKENS):
+    """Summarizer that asks `llm` to fold new exchanges into the previous summary."""
+    def summarize(previous, messages):
+        prompt = SUMMARY_PROMPT.format(words=max_tokens * 3 // 4)
+        body = f"Existing summary:\n{previous or '(none)'}\n\nNew exchanges:\n{_transcript(messages)}"
+        try:
+            answer = llm_ainvoke(llm, [SystemMessage(content=prompt), HumanMessage(content=body)])
+            text = (getattr(answer, "content", answer) or "").strip()
+        except Exception as e:
+            logger.warning(f"Summarizing conversation failed, keeping an extract instead: {str(e)}")
+            return extractive_summary(previous, messages, max_tokens)
+        return _clip(text, max_tokens)
+    return summarize
+
+
+class ConversationMemory:
+    """Sliding window over a chat history with a rolling summary of what fell out.
+
+    build() returns the messages to send: the system prompt, a system note with
+    the summary of older turns (once there are any), and the most recent turns
+    verbatim. The window holds at most `recent_turns` user turns and shrinks
+    further to stay inside `token_budget`; the latest turn is always kept.
+
+    The summary is cached on the instance together with how many messages it
+    covers, and `summarize(previous_summary, new_messages)` is only called when
+    the window slides past messages not yet folded in. Keep one instance per
+    session (e.g. in st.session_state) next to the history it reads.
+    """
+
+    def __init__(self, summarize, token_budget=MEMORY_TOKEN_BUDGET, recent_turns=MEMORY_RECENT_TURNS):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.reset()
+
+    def reset(self):
+        self.summary = None
+        self.summarized = 0  # Messages at the front of the history covered by the summary
+        self._anchor = None  # First message after the summary, to follow it if earlier messages are pruned
+
+    def _realign(self, messages):
+        if self._anchor is None:
+            if self.summarized > len(messages):
+                self.reset()
+            return
+        if self.summarized < len(messages) and messages[self.summarized] is self._anchor:
+            return
+        for index, message in enumerate(messages):
+            if message is self._anchor:
+                self.summarized = index
+                return
+        # History was cleared or replaced
+        self.reset()
+
+    def _window_start(self, system_tokens, messages):
+        starts = turn_starts(messages)
+        start = starts[max(0, len(starts) - self.recent_turns)] if self.recent_turns > 0 else starts[-1]
+        # Never un-summarize: the boundary only moves forward
+        start = max(start, min(self.summarized, starts[-1]))
+        summary_tokens = MEMORY_SUMMARY_TOKENS + _MESSAGE_OVERHEAD if start or self.summary else 0
+        available = self.token_budget - system_tokens - summary_tokens
+        used = sum(estimate_tokens(message) for message in messages[start:])
+        for turn_start in starts:
+            if turn_start <= start:
+                continue
+            if used <= available:
+                break
+            used -= sum(estimate_tokens(message) for message in messages[start:turn_start])
+            start = turn_start
+        return start
+
+    def build(self, system_prompt, messages):
+        """Messages for the next completion: system dicts, then the recent history entries as stored."""
+        self._realign(messages)
+        system = {"role": "system", "content": system_prompt}
+        start = self._window_start(estimate_tokens(system), messages)
+        if start > self.summarized:
+            self.summary = self.summarize(self.summary, messages[self.summarized:start])
+            self.summarized = start
+            self._anchor = messages[start]
+        context = [system]
+        if self.summary:
+            context.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        return context + list(messages[self.summarized:])
+
+    def stats(self):
+        return {"summarized_messages": self.summarized, "has_summary": self.summary is not None}
+
+
+_LANGCHAIN_TYPES = {"system": SystemMessage, "user": HumanMessage, "assistant": AIMessage}
+
+
+def as_langchain_messages(messages):
+    """role/content dicts (as build() returns them) -> LangChain chat messages."""
+    return [_LANGCHAIN_TYPES[m["role"]](content=m["content"]) for m in messages if m["role"] in _LANGCHAIN_TYPES]
@@ -0,0 +1,152 @@
+# readiness.py - Process-wide CTF backend readiness monitor and DNS cache
+from urllib.parse import urlparse
+import os
+import socket
+import threading
+import time
+import requests
+import streamlit as st
+
+BACKEND_PROBE_INTERVAL = float(os.getenv('BACKEND_PROBE_INTERVAL', '30'))  # Seconds between probes while healthy
+BACKEND_BACKOFF_MAX = float(os.getenv('BACKEND_BACKOFF_MAX', '60'))  # Cap for the exponential retry delay
+BACKEND_FAILURE_THRESHOLD = int(os.getenv('BACKEND_FAILURE_THRESHOLD', '3'))  # Failed probes before a healthy backend is marked down
+DNS_CACHE_TTL = float(os.getenv('DNS_CACHE_TTL', '300'))  # Seconds a resolved address is reused
+
+# ====================== DNS Cache ======================
+# Only hosts registered through warmup_dns_from_url are cached; every other
+# lookup goes straight to the resolver. A failed refresh falls back to the last
+# good answer, so a resolver hiccup doesn't take the level down with it.
+_real_getaddrinfo = socket.getaddrinfo
+_dns_lock = threading.Lock()
+_dns_hosts = set()
+_dns_cache = {}  # (host, port, args) -> (expires, addrinfo list)
+
+
+def _cached_getaddrinfo(host, port, *args, **kwargs):
+    if host not in _dns_hosts:
+        return _real_getaddrinfo(host, port, *args, **kwargs)
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    try:
+        result = _real_getaddrinfo(host, port, *args, **kwargs)
+    except OSError:
+        if entry is not None:
+            return entry[1]
+        raise
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_CACHE_TTL, result)
+    return result
+
+
+def warmup_dns_from_url(url):
+    """Register url's host with the DNS cache and resolve it once (retrying briefly on cold start)."""
+    try:
+        parsed = urlparse(url)
+        host = parsed.hostname
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        with _dns_lock:
+            _dns_hosts.add(host)
+            if socket.getaddrinfo is not _cached_getaddrinfo:
+                socket.getaddrinfo = _cached_getaddrinfo
+        for _ in range(5):
+            try:
+                socket.getaddrinfo(host, port)
+                return
+            except OSError:
+                time.sleep(0.2)
+    except Exception:
+        pass
+
+
+def dns_cache_stats():
+    with _dns_lock:
+        return {"hosts": sorted(_dns_hosts), "entries": len(_dns_cache)}
+
+
+# ====================== Backend Monitor ======================
+class BackendMonitor(threading.Thread):
+    """Background thread that probes the CTF backend and keeps a cheap readiness flag.
+
+    Probes run every BACKEND_PROBE_INTERVAL seconds while healthy and back off
+    exponentially (0.5 s, 1 s, 2 s ... up to BACKEND_BACKOFF_MAX) while not.
+    """
+
+    def __init__(self, base_url):
+        super().__init__(name=f"backend-monitor:{base_url}", daemon=True)
+        self.base_url = base_url
+        self.ready = threading.Event()
+        self.failures = 0
+        self.last_check = None
+        self.last_error = None
+
+    def probe(self):
+        try:
+            # Lightweight HEAD; DNS goes through the cache filled by warmup_dns_from_url
+            requests.head(self.base_url, timeout=8, verify=False)
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+
+    def run(self):
+        warmup_dns_from_url(self.base_url)
+        while True:
+            healthy = self.probe()
+            self.last_check = time.time()
+            if healthy:
+                self.failures = 0
+                self.last_error = None
+                self.ready.set()
+                delay = BACKEND_PROBE_INTERVAL
+            else:
+                self.failures += 1
+                # Don't flip a healthy backend to down on a single dropped probe
+                if not self.ready.is_set() or self.failures >= BACKEND_FAILURE_THRESHOLD:
+                    self.ready.clear()
+                delay = min(BACKEND_BACKOFF_MAX, 0.5 * 2 ** (self.failures - 1))
+            time.sleep(delay)
+
+    def status(self):
+        return {
+            "base_url": self.base_url,
+            "ready": self.ready.is_set(),
+            "failures": self.failures,
+            "last_check": self.last_check,
+            "last_error": self.last_error
+        }
+
+
+_monitors_lock = threading.Lock()
+_monitors = {}
+
+
+def start_backend_monitor(base_url):
+    """Start (once per process) and return the monitor for base_url. Safe to call on every rerun."""
+    with _monitors_lock:
+        monitor = _monitors.get(base_url)
+        if monitor is None:
+            monitor = BackendMonitor(base_url)
+            monitor.start()
+            _monitors[base_url] = monitor
+        return monitor
+
+
+def is_ready(base_url):
+    """Non-blocking readiness check for page renders."""
+    return start_backend_monitor(base_url).ready.is_set()
+
+
+def wait_for_backend(base_url: str, timeout: float = 30):
+    """Gate a page render on backend readiness.
+
+    Returns immediately once the monitor has seen the backend; it only waits
+    (on an Event, no network I/O) while the process is still cold.
+    """
+    if start_backend_monitor(base_url).ready.wait(timeout):
+        return True
+    st.error("Cannot reach CTF backend. Please refresh the page in 10 seconds.")
+    st.stop()
@@ -0,0 +1,69 @@
+# streaming.py - Token-by-token rendering of LLM responses for the chat levels
+from itertools import chain
+import streamlit as st
+from config import STREAM_RESPONSES
+from .gateway import llm_slot
+
+
+def is_guardrails_block(error):
+    """True if an LLM error is the F5 AI Guardrails 403 (raised before or mid-stream)."""
+    error_msg = str(error).lower()
+    return "403" in error_msg or "f5 ai guardrails" in error_msg
+
+
+def _chunk_text(chunk):
+    content = getattr(chunk, "content", chunk)
+    return content if isinstance(content, str) else ""
+
+
+def stream_response(runnable, inputs, spinner_text="Thinking…", on_token=None, **kwargs):
+    """Render a runnable's answer into the current container and return the full text.
+
+    With STREAM_RESPONSES on, tokens from runnable.stream() are written with
+    st.write_stream as they arrive; the spinner only covers the wait for the
+    first token. If the stream fails part-way (e.g. F5 AI Guardrails blocks the
+    completion mid-stream) the partial answer is cleared and the exception is
+    re-raised, so callers keep their existing 403 handling.
+
+    The call holds an LLM gateway slot for its whole duration; while queued the
+    player sees their position in the chat.
+
+    on_token, if given, is called with each piece of text as it is rendered
+    (the whole answer at once when streaming is off).
+    """
+    slot = st.empty()
+    with llm_slot():
+        return _render(slot, runnable, inputs, spinner_text, on_token, **kwargs)
+
+
+def _render(slot, runnable, inputs, spinner_text, on_token=None, **kwargs):
+    if not STREAM_RESPONSES:
+        with st.spinner(spinner_text):
+            text = _chunk_text(runnable.invoke(inputs, **kwargs))
+        if on_token is not None:
+            on_token(text)
+        slot.markdown(text)
+        return text
+
+    parts = []
+    stream = iter(runnable.stream(inputs, **kwargs))
+
+    def tokens(first):
+        for chunk in chain(first, stream):
+            text = _chunk_text(chunk)
+            if text:
+                parts.append(text)
+                if on_token is not None:
+                    on_token(text)
+                yield text
+
+    try:
+        # Hold the spinner until the model produces something worth showing
+        with st.spinner(spinner_text):
+            first = [chunk for chunk in [next(stream, None)] if chunk is not None]
+        with slot.container():
+            st.write_stream(tokens(first))
+    except Exception:
+        slot.empty()
+        raise
+    return "".join(parts)
@@ -0,0 +1,35 @@
+# tables.py - Markdown tables rendered straight from query rows
+import os
+
+TABLE_MAX_ROWS = int(os.getenv('TABLE_MAX_ROWS', '100'))  # Rows rendered per result table
+TABLE_MAX_WIDTH = int(os.getenv('TABLE_MAX_WIDTH', '80'))  # Characters per cell before truncation with "…"
+
+
+def _cell(value, max_width):
+    text = "" if value is None else str(value)
+    # Keep every row on one line and don't let a value close the cell early
+    text = text.replace("\r", " ").replace("\n", " ").replace("|", "\\|")
+    if len(text) > max_width:
+        text = text[:max_width - 1] + "…"
+    return text
+
+
+def markdown_table(columns, rows, max_rows=TABLE_MAX_ROWS, max_width=TABLE_MAX_WIDTH):
+    """Format an iterable of rows as a markdown table, reading at most max_rows + 1 of them.
+
+    Returns (markdown, row_count, truncated); rows are consumed lazily, so a
+    cursor can be passed directly and nothing is copied beyond what is shown.
+    """
+    lines = [
+        "| " + " | ".join(_cell(column, max_width) for column in columns) + " |",
+        "|" + "|".join(":" + "-" * max(3, min(len(str(column)), max_width)) for column in columns) + "|"
+    ]
+    count = 0
+    truncated = False
+    for row in rows:
+        if count == max_rows:
+            truncated = True
+            break
+        lines.append("| " + " | ".join(_cell(value, max_width) for value in row) + " |")
+        count += 1
+    return "\n".join(lines), count, truncated
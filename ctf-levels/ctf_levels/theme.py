@@ -0,0 +1,161 @@
+# theme.py - Page styling shared by the CTF levels
+# The standard levels use the plain theme; the guardrails levels use the sky-blue one
+
+DEFAULT_CSS = """
+<style>
+/* Hide Streamlit branding */
+#MainMenu {visibility: hidden;}
+.stDeployButton {display:none;}
+footer {visibility: hidden;}
+header {visibility: hidden;}
+
+.stApp {
+    background-color: #ffffff;
+    font-family: "Segoe UI", "Roboto", sans-serif;
+}
+
+/* Chat message container */
+.chat-message {
+    padding: 1rem;
+    border-radius: 1rem;
+    margin-bottom: 1rem;
+    max-width: 80%;
+}
+.chat-message.user {
+    background-color: #e3f2fd;
+    margin-left: auto;
+    border: 1px solid #90caf9;
+}
+.chat-message.bot {
+    background-color: #ffffff;
+    border: 1px solid #dee2e6;
+    margin-right: auto;
+}
+.timestamp {
+    font-size: 0.7rem;
+    color: #6c757d;
+    margin-top: 0.2rem;
+}
+
+/* Input box */
+.stTextInput input {
+    border-radius: 0.8rem;
+    border: 1px solid #ced4da;
+    padding: 0.6rem 1rem;
+}
+
+/* Button */
+.stButton>button {
+    background: linear-gradient(90deg, #4e73df, #1cc88a);
+    color: white;
+    border-radius: 0.5rem;
+    border: none;
+    padding: 0.6rem 1.2rem;
+    font-weight: 500;
+    transition: 0.2s;
+}
+.stButton>button:hover {
+    opacity: 0.9;
+    transform: scale(1.02);
+}
+</style>
+"""
+
+GUARDRAILS_CSS = """
+<style>
+/* Hide Streamlit branding */
+#MainMenu {visibility: hidden;}
+.stDeployButton {display:none;}
+footer {visibility: hidden;}
+header {visibility: hidden;}
+
+/* Beautiful sky-blue gradient background */
+.stApp {
+    background: linear-gradient(135deg, #bae7ff 0%, #e3f2fd 100%);
+    background-attachment: fixed;
+}
+
+/* CRITICAL: Remove white background from the iframe & all inner containers */
+iframe {
+    background: transparent !important;
+}
+[data-testid="stAppViewContainer"],
+[data-testid="stDecoration"],
+section.main > div,
+.main .block-container,
+div[data-testid="stVerticalBlock"] {
+    background: transparent !important;
+}
+
+/* Optional: Make chat messages look like elegant glass cards on the sky background */
+.stChatMessage {
+    background: rgba(255, 255, 255, 0.94) !important;
+    border-radius: 18px !important;
+    backdrop-filter: blur(10px);
+    box-shadow: 0 4px 20px rgba(0, 0, 0, 0.08);
+    margin: 10px 0;
+}
+
+/* Your existing custom chat bubble styling (keep these!) */
+.chat-message {
+    padding: 1rem;
+    border-radius: 1rem;
+    margin-bottom: 1rem;
+    max-width: 80%;
+}
+.chat-message.user {
+    background-color: #e3f2fd;
+    margin-left: auto;
+    border: 1px solid #90caf9;
+}
+.chat-message.bot {
+    background-color: #ffffff;
+    border: 1px solid #e0e0e0;
+    margin-right: auto;
+}
+.stTextInput input {
+    border-radius: 0.8rem;
+    border: 1px solid #ced4da;
+    padding: 0.6rem 1rem;
+}
+.stButton>button {
+    background: linear-gradient(90deg, #4e73df, #1cc88a);
+    color: white;
+    border-radius: 0.5rem;
+    border: none;
+    padding: 0.6rem 1.2rem;
+    font-weight: 500;
+}
+.stButton>button:hover {
+    opacity: 0.9;
+    transform: scale(1.02);
+}
+</style>
+"""
+
+# Extra rules for levels that render query results as markdown tables (level 8)
+TABLE_CSS = """
+<style>
+/* Style for markdown table */
+table {
+    border-collapse: collapse;
+    width: 100%;
+    border: 1px solid #dee2e6;
+    border-radius: 0.5rem;
+    overflow: hidden;
+    background-color: #ffffff;
+}
+th, td {
+    padding: 0.75rem;
+    text-align: left;
+    border-bottom: 1px solid #dee2e6;
+}
+th {
+    background-color: #f8f9fa;
+    font-weight: 600;
+}
+tr:last-child td {
+    border-bottom: none;
+}
+</style>
+"""
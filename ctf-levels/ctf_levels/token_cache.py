@@ -0,0 +1,74 @@
+# token_cache.py - Validated-session cache for the level token check
+from collections import OrderedDict
+import os
+import threading
+import time
+import requests
+import streamlit as st
+
+# Level tokens are issued by the backend with a 24 h expiry, so a validation result
+# can be trusted for at most that long. Within the TTL the backend is asked again
+# lazily (on the next rerun after TOKEN_RECHECK_INTERVAL) so a logout still takes
+# effect, instead of POSTing /api/validate-token on every Streamlit rerun.
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', str(24 * 3600)))  # Seconds a validation is trusted at most
+TOKEN_RECHECK_INTERVAL = int(os.getenv('TOKEN_RECHECK_INTERVAL', '900'))  # Seconds before a lazy re-validation
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '10000'))  # Max sessions kept in the process cache
+
+_lock = threading.Lock()
+_validated = OrderedDict()  # (username, level, token) -> {"validated_at", "expires"}
+
+
+def _lookup(key, now):
+    # Session state first (no lock), then the process cache so page reloads
+    # and new tabs with the same token are also served without a round trip
+    entry = st.session_state.get("_validated_tokens", {}).get(key)
+    if entry is None:
+        with _lock:
+            entry = _validated.get(key)
+            if entry is not None:
+                _validated.move_to_end(key)
+    if entry is None or now >= entry["expires"]:
+        return None
+    return entry
+
+
+def _remember(key, now):
+    entry = {"validated_at": now, "expires": now + TOKEN_CACHE_TTL}
+    st.session_state.setdefault("_validated_tokens", {})[key] = entry
+    with _lock:
+        _validated[key] = entry
+        _validated.move_to_end(key)
+        while len(_validated) > TOKEN_CACHE_SIZE:
+            _validated.popitem(last=False)
+
+
+def _forget(key):
+    st.session_state.get("_validated_tokens", {}).pop(key, None)
+    with _lock:
+        _validated.pop(key, None)
+
+
+def validate_token(api_base_url, username, level, token, timeout=None):
+    """Return True if the backend accepts this level token, using cached results when fresh.
+
+    `level` is sent as-is, so guardrails levels pass f"guard-{level}". Network
+    errors from requests propagate to the caller like the direct POST did.
+    """
+    key = (username, str(level), token)
+    now = time.time()
+    entry = _lookup(key, now)
+    if entry is not None and now - entry["validated_at"] < TOKEN_RECHECK_INTERVAL:
+        return True
+
+    response = requests.post(
+        f"{api_base_url}/api/validate-token",
+        json={'username': username, 'level': level, 'token': token},
+        headers={'Content-Type': 'application/json'},
+        timeout=timeout,
+        verify=False
+    )
+    if response.status_code != 200 or not response.json().get('valid', False):
+        _forget(key)
+        return False
+    _remember(key, now)
+    return True
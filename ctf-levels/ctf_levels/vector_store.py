@@ -0,0 +1,244 @@
+# vector_store.py - Idempotent, persistent vector index for the RAG levels
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from config import VECTOR_BACKEND
+
+MANIFEST_NAME = "index_manifest.json"
+NUMPY_INDEX_NAME = "numpy_index"
+
+logger = logging.getLogger(__name__)
+
+
+def content_id(text):
+    """Stable document ID: the same text always maps to the same vector."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _read_manifest(persist_directory):
+    try:
+        with open(os.path.join(persist_directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(persist_directory, manifest):
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _wanted(texts):
+    wanted = {}
+    for text in texts:
+        wanted.setdefault(content_id(text), text)
+    return wanted
+
+
+def load_or_build_chroma(texts, embedding, persist_directory, collection_name="langchain"):
+    """Open the persisted collection and sync it to `texts`, embedding only what changed.
+
+    Documents are keyed by content hash and the manifest records which model
+    embedded them. New texts are embedded and added, texts no longer in the
+    corpus (and the random-ID duplicates earlier from_texts() builds appended
+    on every restart) are deleted, and a model change triggers a full rebuild.
+    """
+    # Imported here so the numpy backend never loads chromadb
+    from langchain_community.vectorstores import Chroma
+
+    model = getattr(embedding, "model", None)
+    wanted = _wanted(texts)
+
+    manifest = _read_manifest(persist_directory)
+    vector_db = Chroma(
+        collection_name=collection_name,
+        embedding_function=embedding,
+        persist_directory=persist_directory
+    )
+    if manifest and manifest.get("embedding_model") != model:
+        logger.warning(f"Embedding model changed ({manifest.get('embedding_model')} -> {model}); rebuilding index")
+        vector_db.delete_collection()
+        vector_db = Chroma(
+            collection_name=collection_name,
+            embedding_function=embedding,
+            persist_directory=persist_directory
+        )
+
+    stored = set(vector_db.get(include=[])["ids"])
+    stale = [doc_id for doc_id in stored if doc_id not in wanted]
+    if stale:
+        vector_db.delete(ids=stale)
+    missing = [doc_id for doc_id in wanted if doc_id not in stored]
+    if missing:
+        vector_db.add_texts([wanted[doc_id] for doc_id in missing], ids=missing)
+
+    _write_manifest(persist_directory, {
+        "collection": collection_name,
+        "embedding_model": model,
+        "ids": list(wanted),
+        "updated": time.time()
+    })
+    logger.info(f"Vector index {collection_name}: {len(missing)} embedded, {len(stale)} removed, {len(wanted)} total")
+    return vector_db
+
+
+# ====================== NumPy Backend ======================
+class NumpyVectorStore(VectorStore):
+    """In-process vector index: one float32 matrix of L2-normalized embeddings.
+
+    Search is a single matrix-vector product (cosine similarity) plus
+    argpartition for the top k. With a persist_directory the matrix is saved as
+    .npy and reopened memory-mapped, next to a JSON file with the IDs, texts and
+    metadata. Writes replace the files atomically, so readers never see a
+    half-written index.
+    """
+
+    def __init__(self, embedding, persist_directory=None):
+        self._embedding = embedding
+        self.persist_directory = persist_directory
+        self._lock = threading.Lock()
+        # (matrix, ids, texts, metadatas), swapped as one reference so searches never see a torn index
+        self._index = (np.zeros((0, 0), dtype=np.float32), [], [], [])
+        self.embedding_model = getattr(embedding, "model", None)
+        if persist_directory:
+            self._load()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    @property
+    def ids(self):
+        return list(self._index[1])
+
+    def _paths(self):
+        base = os.path.join(self.persist_directory, NUMPY_INDEX_NAME)
+        return base + ".npy", base + ".json"
+
+    def _load(self):
+        matrix_path, meta_path = self._paths()
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            matrix = np.load(matrix_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return
+        if meta.get("embedding_model") != self.embedding_model or len(meta["ids"]) != len(matrix):
+            logger.warning("NumPy index does not match the current embedding model; starting empty")
+            return
+        self._index = (matrix, meta["ids"], meta["texts"], meta["metadatas"])
+
+    def _save(self, matrix, ids, texts, metadatas):
+        # Caller holds the lock
+        if not self.persist_directory:
+            self._index = (matrix, ids, texts, metadatas)
+            return
+        os.makedirs(self.persist_directory, exist_ok=True)
+        matrix_path, meta_path = self._paths()
+        with open(matrix_path + ".tmp", "wb") as f:
+            np.save(f, matrix)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({
+                "embedding_model": self.embedding_model,
+                "ids": ids,
+                "texts": texts,
+                "metadatas": metadatas
+            }, f)
+        os.replace(matrix_path + ".tmp", matrix_path)
+        os.replace(meta_path + ".tmp", meta_path)
+        self._index = (np.load(matrix_path, mmap_mode="r"), ids, texts, metadatas)
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [content_id(text) for text in texts]
+        vectors = self._normalize(self._embedding.embed_documents(texts))
+        with self._lock:
+            old_matrix, old_ids, old_texts, old_metadatas = self._index
+            matrix = vectors if not old_ids else np.vstack([old_matrix, vectors])
+            self._save(matrix, old_ids + ids, old_texts + texts, old_metadatas + metadatas)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        drop = set(ids or [])
+        with self._lock:
+            matrix, old_ids, texts, metadatas = self._index
+            keep = [i for i, doc_id in enumerate(old_ids) if doc_id not in drop]
+            if len(keep) == len(old_ids):
+                return True
+            self._save(
+                np.ascontiguousarray(matrix[keep]),
+                [old_ids[i] for i in keep],
+                [texts[i] for i in keep],
+                [metadatas[i] for i in keep]
+            )
+        return True
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4):
+        matrix, _, texts, metadatas = self._index
+        if not len(texts):
+            return []
+        scores = matrix @ self._normalize(embedding)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(Document(page_content=texts[i], metadata=metadatas[i]), float(scores[i])) for i in top]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> relevance in [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_directory=None, **kwargs):
+        store = cls(embedding, persist_directory=persist_directory)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+def load_or_build_numpy(texts, embedding, persist_directory):
+    """NumPy twin of load_or_build_chroma: embed only new texts, drop removed ones."""
+    wanted = _wanted(texts)
+    vector_db = NumpyVectorStore(embedding, persist_directory=persist_directory)
+    stored = set(vector_db.ids)
+    stale = [doc_id for doc_id in stored if doc_id not in wanted]
+    if stale:
+        vector_db.delete(ids=stale)
+    missing = [doc_id for doc_id in wanted if doc_id not in stored]
+    if missing:
+        vector_db.add_texts([wanted[doc_id] for doc_id in missing], ids=missing)
+    logger.info(f"NumPy index: {len(missing)} embedded, {len(stale)} removed, {len(wanted)} total")
+    return vector_db
+
+
+def load_or_build_vector_store(texts, embedding, persist_directory):
+    """Index `texts` with the backend chosen by VECTOR_BACKEND ('chroma' or 'numpy')."""
+    if VECTOR_BACKEND == "numpy":
+        return load_or_build_numpy(texts, embedding, persist_directory)
+    return load_or_build_chroma(texts, embedding, persist_directory)
@@ -1,55 +1,13 @@
 # guardrails-level7.py - OWASP LLM09: Misinformation (Protected by F5 AI Guardrails)
 from config import get_llm
+from ctf_levels import Level, stream_response, is_guardrails_block, sidebar_panel, render_chat_history
 import streamlit as st
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
-import requests
-import os
-import json
-import time
-from urllib.parse import urlparse
-import socket
 import re
 
-# ====================== DNS & Backend Warmup ======================
-def warmup_dns_from_url(url):
-    try:
-        parsed = urlparse(url)
-        host = parsed.hostname
-        port = parsed.port or (443 if parsed.scheme == "https" else 80)
-        for _ in range(5):
-            try:
-                socket.getaddrinfo(host, port)
-                return
-            except:
-                time.sleep(0.2)
-    except Exception:
-        pass
-
-def wait_for_backend(base_url: str, timeout: int = 90):
-    """Wait until CTF backend is reachable — fixes DNS on cold start"""
-    #st.info("Connecting to CTF backend... (first start may take a few seconds)")
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            host = urlparse(base_url).hostname
-            socket.gethostbyname(host)  # DNS check
-            # Try a lightweight endpoint (most CTF backends have /health or accept HEAD)
-            requests.head(base_url, timeout=8, verify=False)
-            #st.success("Connected to CTF backend!")
-            return True
-        except Exception:
-            time.sleep(2)
-    st.error("Cannot reach CTF backend. Please refresh the page in 10 seconds.")
-    st.stop()
-
 # Initialize LLM (now protected by guardrails)
 llm = get_llm()
 
-# Environment variable for API base URL
-API_BASE_URL = os.getenv('API_BASE_URL', 'https://ai-ctf.xc.edgecnf.com')
-warmup_dns_from_url(API_BASE_URL)
-
 # Ground truth & flag pieces (same as vulnerable version)
 GROUND_TRUTH = {
     "company_experience": {
@@ -133,261 +91,18 @@ def check_misinformation_submission(user_input, category):
     
     return False, None
 
-def level_logic(level, user_avatar, ai_avatar):
-    flag_complete = "FLAG{l7_g41fy0oqsg83tukb}"
-    
-    if "level_data" not in st.session_state:
-        st.session_state.level_data = {
-            "flag": flag_complete,
-            "verified_misinfo": set(),
-            "flag_pieces": {},
-            "investigation_mode": "chat"
-        }
-
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-        st.session_state.system_prompt = create_vulnerable_prompt()
-
-    # Sidebar - Hallucination Hunter Dashboard
-    with st.sidebar:
-        st.markdown("### Hallucination Hunter (Guardrails Mode)")
-        total_pieces = len(GROUND_TRUTH)
-        verified_count = len(st.session_state.level_data["verified_misinfo"])
-        progress = verified_count / total_pieces if total_pieces > 0 else 0
-        st.progress(progress)
-        st.markdown(f"**{verified_count}/{total_pieces}** Pieces Found")
-        st.divider()
-        st.markdown("#### Verification Source")
-        st.markdown(f"**[Arcadia Finance Website]({VERIFICATION_URLS['homepage']})**")
-        st.caption("Cross-check every claim!")
-        st.divider()
-
-        mode = st.radio(
-            "Investigation Mode",
-            ["Chat & Investigate", "Submit Findings"],
-            key="mode_selector",
-            label_visibility="collapsed"
-        )
-        st.session_state.level_data["investigation_mode"] = "chat" if "Chat" in mode else "submit"
-        st.divider()
-
-        st.markdown("#### Evidence Collected")
-        if st.session_state.level_data["flag_pieces"]:
-            for category in GROUND_TRUTH.keys():
-                if category in st.session_state.level_data["verified_misinfo"]:
-                    piece = st.session_state.level_data["flag_pieces"][category]
-                    cat_name = GROUND_TRUTH[category]['category']
-                    st.success(f"**{cat_name}**")
-                    st.code(piece, language="text")
-        else:
-            st.info("No evidence found yet.\nAsk questions and verify everything!")
-
-        if verified_count == total_pieces:
-            st.divider()
-            st.balloons()
-            st.success("**INVESTIGATION COMPLETE!**")
-            st.markdown("### Complete Flag:")
-            st.code(flag_complete, language="text")
-
-        if st.button("Reset Investigation", key="reset_btn"):
-            for key in ["messages", "level_data"]:
-                if key in st.session_state:
-                    del st.session_state[key]
-            st.rerun()
-
-    # Main chat / submit area
-    if st.session_state.level_data["investigation_mode"] == "chat":
-        for message in st.session_state.messages:
-            avatar = user_avatar if message["role"] == "user" else ai_avatar
-            with st.chat_message(message["role"], avatar=avatar):
-                st.markdown(message["content"])
-
-        if prompt := st.chat_input(f"Chat with Protected AI Bot (Guardrails Level {level})", key=f"chat_input_guardrails_level_{level}"):
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.chat_message("user", avatar=user_avatar):
-                st.markdown(prompt)
-
-            messages = [
-                SystemMessage(content=st.session_state.system_prompt),
-                HumanMessage(content=prompt)
-            ]
-
-            try:
-                print(f"[Guardrails Level {level}] Sending prompt: {prompt}")
-                response = llm.invoke(messages).content
-                print(f"[Guardrails Level {level}] Response: {response}")
-
-                with st.chat_message("assistant", avatar=ai_avatar):
-                    st.markdown(response)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-
-            except Exception as e:
-                error_msg = str(e).lower()
-                print(f"[Guardrails Level {level}] LLM Error: {e}")
-                if "403" in error_msg or "f5 ai guardrails" in error_msg or "blocked" in error_msg:
-                    st.error("Request blocked by F5 AI Guardrails – your input triggered a security rule.")
-                else:
-                    st.error(f"Failed to process request: {str(e)}")
-                st.session_state.messages.append({"role": "assistant", "content": "Error: Unable to process your request."})
-
-    else:
-        st.markdown("### Submit Your Findings")
-        st.caption("Report exact false claims made by the AI to unlock flag pieces.")
 
-        remaining = {k: v for k, v in GROUND_TRUTH.items() if k not in st.session_state.level_data["verified_misinfo"]}
-        if not remaining:
-            st.success("All misinformation identified!")
-        else:
-            st.warning(f"**{len(remaining)} piece(s)** remaining")
+class GuardrailsLevel7(Level):
+    number = 7
+    guardrails = True
+    flag = "FLAG{l7_g41fy0oqsg83tukb}"
+    title = "CTF Guardrails Level {level}: Depending beyond its reliability (Protected)"
+    page_title = "CTF Guardrails Level {level}"
+    page_icon = "🔒"
+    info_label = "Challenge Info"
+    history_in_page = False
 
-            misinformation_input = st.text_input(
-                "What false information did the AI give you?",
-                placeholder="Enter the exact false claim...",
-                key="misinfo_input"
-            )
-            col1, col2 = st.columns([1, 3])
-            with col1:
-                submit_btn = st.button("Verify Claim", type="primary")
-            with col2:
-                st.caption("Must match exactly (case-insensitive)")
-
-            if submit_btn and misinformation_input:
-                matched = False
-                for cat_key, data in remaining.items():
-                    correct, match_type = check_misinformation_submission(misinformation_input, cat_key)
-                    if correct:
-                        st.session_state.level_data["verified_misinfo"].add(cat_key)
-                        st.session_state.level_data["flag_pieces"][cat_key] = data["flag_piece"]
-                        st.success("**HALLUCINATION CONFIRMED!**")
-                        st.markdown(f"**Category:** {data['category']}")
-                        st.markdown(f"**False:** {data['misinformation']} → **True:** {data['correct']}")
-                        st.markdown(f"**Source:** [{data['page_name']}]({data['verification_url']})")
-                        st.markdown(f"**Flag Piece:** `{data['flag_piece']}`")
-                        time.sleep(2)
-                        st.rerun()
-                        matched = True
-                        break
-                if not matched:
-                    st.error("No match found. Try copying the exact false statement.")
-
-def main():
-    level = 7
-    wait_for_backend(API_BASE_URL, timeout=90)
-
-    # Token & username retrieval
-    max_attempts = 3
-    for attempt in range(max_attempts):
-        query_params = st.query_params.to_dict()
-        token = ''.join(query_params.get('token', [None]) or [])
-        username = ''.join(query_params.get('username', [None]) or [])
-        if token and username:
-            break
-        if attempt < max_attempts - 1:
-            time.sleep(0.5)
-            st.rerun()
-    else:
-        st.error("Access denied: Missing token.")
-        st.stop()
-
-    if 'username' not in st.session_state:
-        st.session_state.username = username
-
-    # Validate guardrails token
-    validation_url = f"{API_BASE_URL}/api/validate-token"
-    payload = {
-        'username': username,
-        'level': f"guard-{level}",
-        'token': token
-    }
-    response = requests.post(validation_url, json=payload, headers={'Content-Type': 'application/json'}, verify=False)
-    if response.status_code != 200 or not response.json().get('valid', False):
-        st.error("Access denied: Invalid guardrails token.")
-        st.stop()
-
-    st.set_page_config(page_title=f"CTF Guardrails Level {level}", page_icon="🔒", layout="wide")
-
-    USER_AVATAR = "user.png"
-    AI_AVATAR = "ai.png"
-
-    st.title(f"CTF Guardrails Level {level}: Depending beyond its reliability (Protected)")
-
-    # --- CUSTOM CSS (FULLY FIXED - NO MORE WHITE IFRAME) ---
-    st.markdown(
-        """
-        <style>
-        /* Hide Streamlit branding */
-        #MainMenu {visibility: hidden;}
-        .stDeployButton {display:none;}
-        footer {visibility: hidden;}
-        header {visibility: hidden;}
-
-        /* Beautiful sky-blue gradient background */
-        .stApp {
-            background: linear-gradient(135deg, #bae7ff 0%, #e3f2fd 100%);
-            background-attachment: fixed;
-        }
-
-        /* CRITICAL: Remove white background from the iframe & all inner containers */
-        iframe {
-            background: transparent !important;
-        }
-        [data-testid="stAppViewContainer"],
-        [data-testid="stDecoration"],
-        section.main > div,
-        .main .block-container,
-        div[data-testid="stVerticalBlock"] {
-            background: transparent !important;
-        }
-
-        /* Optional: Make chat messages look like elegant glass cards on the sky background */
-        .stChatMessage {
-            background: rgba(255, 255, 255, 0.94) !important;
-            border-radius: 18px !important;
-            backdrop-filter: blur(10px);
-            box-shadow: 0 4px 20px rgba(0, 0, 0, 0.08);
-            margin: 10px 0;
-        }
-
-        /* Your existing custom chat bubble styling (keep these!) */
-        .chat-message {
-            padding: 1rem;
-            border-radius: 1rem;
-            margin-bottom: 1rem;
-            max-width: 80%;
-        }
-        .chat-message.user {
-            background-color: #e3f2fd;
-            margin-left: auto;
-            border: 1px solid #90caf9;
-        }
-        .chat-message.bot {
-            background-color: #ffffff;
-            border: 1px solid #e0e0e0;
-            margin-right: auto;
-        }
-        .stTextInput input {
-            border-radius: 0.8rem;
-            border: 1px solid #ced4da;
-            padding: 0.6rem 1rem;
-        }
-        .stButton>button {
-            background: linear-gradient(90deg, #4e73df, #1cc88a);
-            color: white;
-            border-radius: 0.5rem;
-            border: none;
-            padding: 0.6rem 1.2rem;
-            font-weight: 500;
-        }
-        .stButton>button:hover {
-            opacity: 0.9;
-            transform: scale(1.02);
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-    with st.expander("Challenge Info", expanded=False):
+    def render_info(self):
         st.markdown("### Scenario")
         st.markdown("This is the **guardrails-protected** version of Level 7. The AI assistant is now shielded by F5 AI Guardrails, making it much harder (or impossible) to extract or manipulate the misinformation directly.")
         st.markdown("### Challenge")
@@ -400,7 +115,167 @@ def main():
         st.progress(0.7)
         st.caption("7 / 10 flags captured (Guardrails Mode)")
 
-    level_logic(level, USER_AVATAR, AI_AVATAR)
+    def level_logic(self, level, user_avatar, ai_avatar):
+        flag_complete = self.flag
+
+        if "level_data" not in st.session_state:
+            st.session_state.level_data = {
+                "flag": flag_complete,
+                "verified_misinfo": set(),
+                "flag_pieces": {},
+                "investigation_mode": "chat"
+            }
+
+        if "messages" not in st.session_state:
+            st.session_state.messages = []
+            st.session_state.system_prompt = create_vulnerable_prompt()
+
+        total_pieces = len(GROUND_TRUTH)
+
+        def render_progress():
+            verified_count = len(st.session_state.level_data["verified_misinfo"])
+            progress = verified_count / total_pieces if total_pieces > 0 else 0
+            st.progress(progress)
+            st.markdown(f"**{verified_count}/{total_pieces}** Pieces Found")
+
+        def render_evidence():
+            st.markdown("#### Evidence Collected")
+            if st.session_state.level_data["flag_pieces"]:
+                for category in GROUND_TRUTH.keys():
+                    if category in st.session_state.level_data["verified_misinfo"]:
+                        piece = st.session_state.level_data["flag_pieces"][category]
+                        cat_name = GROUND_TRUTH[category]['category']
+                        st.success(f"**{cat_name}**")
+                        st.code(piece, language="text")
+            else:
+                st.info("No evidence found yet.\nAsk questions and verify everything!")
+
+            if len(st.session_state.level_data["verified_misinfo"]) == total_pieces:
+                st.divider()
+                st.balloons()
+                st.success("**INVESTIGATION COMPLETE!**")
+                st.markdown("### Complete Flag:")
+                st.code(flag_complete, language="text")
+
+        # Sidebar - Hallucination Hunter Dashboard; progress and evidence redraw in place
+        with st.sidebar:
+            st.markdown("### Hallucination Hunter (Guardrails Mode)")
+            refresh_progress = sidebar_panel(render_progress)
+            st.divider()
+            st.markdown("#### Verification Source")
+            st.markdown(f"**[Arcadia Finance Website]({VERIFICATION_URLS['homepage']})**")
+            st.caption("Cross-check every claim!")
+            st.divider()
+
+            mode = st.radio(
+                "Investigation Mode",
+                ["Chat & Investigate", "Submit Findings"],
+                key="mode_selector",
+                label_visibility="collapsed"
+            )
+            st.session_state.level_data["investigation_mode"] = "chat" if "Chat" in mode else "submit"
+            st.divider()
+
+            refresh_evidence = sidebar_panel(render_evidence)
+
+            if st.button("Reset Investigation", key="reset_btn"):
+                st.session_state.messages = []
+                st.session_state.system_prompt = create_vulnerable_prompt()
+                st.session_state.level_data = {
+                    "flag": flag_complete,
+                    "verified_misinfo": set(),
+                    "flag_pieces": {},
+                    "investigation_mode": "chat"
+                }
+                refresh_progress()
+                refresh_evidence()
+
+        # Main chat / submit area; each runs as a fragment
+        if st.session_state.level_data["investigation_mode"] == "chat":
+            @self.fragment
+            def chat():
+                render_chat_history(st.session_state.messages, user_avatar, ai_avatar)
+
+                if prompt := st.chat_input(f"Chat with Protected AI Bot (Guardrails Level {level})", key=f"chat_input_guardrails_level_{level}"):
+                    st.session_state.messages.append({"role": "user", "content": prompt})
+                    with st.chat_message("user", avatar=user_avatar):
+                        st.markdown(prompt)
+
+                    messages = [
+                        SystemMessage(content=st.session_state.system_prompt),
+                        HumanMessage(content=prompt)
+                    ]
+
+                    with st.chat_message("assistant", avatar=ai_avatar):
+                        try:
+                            print(f"[Guardrails Level {level}] Sending prompt: {prompt}")
+                            response = stream_response(llm, messages)
+                            print(f"[Guardrails Level {level}] Response: {response}")
+                            st.session_state.messages.append({"role": "assistant", "content": response})
+
+                        except Exception as e:
+                            error_msg = str(e).lower()
+                            print(f"[Guardrails Level {level}] LLM Error: {e}")
+                            if is_guardrails_block(e) or "blocked" in error_msg:
+                                st.error("Request blocked by F5 AI Guardrails – your input triggered a security rule.")
+                            else:
+                                st.error(f"Failed to process request: {str(e)}")
+                            st.session_state.messages.append({"role": "assistant", "content": "Error: Unable to process your request."})
+
+            chat()
+
+        else:
+            st.markdown("### Submit Your Findings")
+            st.caption("Report exact false claims made by the AI to unlock flag pieces.")
+
+            @self.fragment
+            def submit():
+                remaining = {k: v for k, v in GROUND_TRUTH.items() if k not in st.session_state.level_data["verified_misinfo"]}
+                if not remaining:
+                    st.success("All misinformation identified!")
+                    return
+
+                # Filled in after the claim is checked, so the count is never a turn behind
+                remaining_status = st.empty()
+
+                misinformation_input = st.text_input(
+                    "What false information did the AI give you?",
+                    placeholder="Enter the exact false claim...",
+                    key="misinfo_input"
+                )
+                col1, col2 = st.columns([1, 3])
+                with col1:
+                    submit_btn = st.button("Verify Claim", type="primary")
+                with col2:
+                    st.caption("Must match exactly (case-insensitive)")
+
+                if submit_btn and misinformation_input:
+                    matched = False
+                    for cat_key, data in remaining.items():
+                        correct, match_type = check_misinformation_submission(misinformation_input, cat_key)
+                        if correct:
+                            st.session_state.level_data["verified_misinfo"].add(cat_key)
+                            st.session_state.level_data["flag_pieces"][cat_key] = data["flag_piece"]
+                            st.success("**HALLUCINATION CONFIRMED!**")
+                            st.markdown(f"**Category:** {data['category']}")
+                            st.markdown(f"**False:** {data['misinformation']} → **True:** {data['correct']}")
+                            st.markdown(f"**Source:** [{data['page_name']}]({data['verification_url']})")
+                            st.markdown(f"**Flag Piece:** `{data['flag_piece']}`")
+                            refresh_progress()
+                            refresh_evidence()
+                            matched = True
+                            break
+                    if not matched:
+                        st.error("No match found. Try copying the exact false statement.")
+
+                remaining_count = total_pieces - len(st.session_state.level_data["verified_misinfo"])
+                if remaining_count:
+                    remaining_status.warning(f"**{remaining_count} piece(s)** remaining")
+                else:
+                    remaining_status.success("All misinformation identified!")
+
+            submit()
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    GuardrailsLevel7().run()
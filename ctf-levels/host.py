@@ -0,0 +1,47 @@
+# host.py - Serve every CTF level from one Streamlit process
+#
+# Each level script is registered as a hidden page whose
+# url_path matches its nginx location (/level1 ... /level10, /guardrails-level1 ...),
+# and runs exactly as it would under `streamlit run levelN.py`. Because they now
+# share one interpreter, streamlit/langchain/chromadb are imported once and every
+# level draws from the same LLM client pool (config.get_llm) and backend monitor.
+import streamlit as st
+# Imported only for their side effects: config loads the OpenAI/langchain clients
+# and their shared registry, ctf_levels starts the backend monitor, so the first
+# visit to any level is already warm
+import config  # noqa: F401  # warm shared clients at startup
+import ctf_levels  # noqa: F401  # warm shared clients and caches at startup
+
+LEVEL_COUNT = 10
+
+# Session keys that survive moving between levels in the same browser session
+SHARED_SESSION_KEYS = {"_validated_tokens", "_host_page"}
+
+
+def unknown_level():
+    st.write("Access denied: Unknown level.")
+
+
+def level_pages():
+    pages = []
+    for n in range(1, LEVEL_COUNT + 1):
+        pages.append(st.Page(f"level{n}.py", title=f"CTF Level {n}", url_path=f"level{n}"))
+        pages.append(st.Page(f"guardrails-level{n}.py", title=f"CTF Guardrails Level {n}", url_path=f"guardrails-level{n}"))
+    return pages
+
+
+def main():
+    page = st.navigation([st.Page(unknown_level, title="CTF", default=True)] + level_pages(), position="hidden")
+
+    # Every level keeps its state under the same names (messages, level_data, ...),
+    # so switching levels inside one session must not carry another level's chat over
+    if st.session_state.get("_host_page") != page.url_path:
+        for key in list(st.session_state.keys()):
+            if key not in SHARED_SESSION_KEYS:
+                del st.session_state[key]
+        st.session_state["_host_page"] = page.url_path
+
+    page.run()
+
+
+main()
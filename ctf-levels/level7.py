@@ -1,49 +1,8 @@
 # level7.py - OWASP LLM09: Misinformation
 from config import get_llm
+from ctf_levels import Level, stream_response, sidebar_panel, render_chat_history
 import streamlit as st
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
-from pathlib import Path
-import requests
-import os
-import json
-import time
-from urllib.parse import urlparse
-import time
-import socket
-
-# ====================== DNS & Backend Warmup ======================
-def warmup_dns_from_url(url):
-    try:
-        parsed = urlparse(url)
-        host = parsed.hostname
-        port = parsed.port or (443 if parsed.scheme == "https" else 80)
-        for _ in range(5):
-            try:
-                socket.getaddrinfo(host, port)
-                return
-            except:
-                time.sleep(0.2)
-    except Exception:
-        pass
-
-def wait_for_backend(base_url: str, timeout: int = 90):
-    """Wait until CTF backend is reachable — fixes DNS on cold start"""
-    #st.info("Connecting to CTF backend... (first start may take a few seconds)")
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            host = urlparse(base_url).hostname
-            socket.gethostbyname(host)  # DNS check
-            # Try a lightweight endpoint (most CTF backends have /health or accept HEAD)
-            requests.head(base_url, timeout=8, verify=False)
-            #st.success("Connected to CTF backend!")
-            return True
-        except Exception:
-            time.sleep(2)
-    st.error("Cannot reach CTF backend. Please refresh the page in 10 seconds.")
-    st.stop()
-
 
 # Initialize LLM
 llm = get_llm()
@@ -51,11 +10,6 @@ llm = get_llm()
 # FLAG FLAG{l7_g41fy0oqsg83tukb}
 
 
-# Environment variable for API base URL
-API_BASE_URL = os.getenv('API_BASE_URL', 'https://ai-ctf.xc.edgecnf.com')
-
-warmup_dns_from_url(API_BASE_URL)
-
 
 # Ground truth about Arcadia Finance (verifiable from 3 different pages)
 GROUND_TRUTH = {
@@ -153,329 +107,37 @@ def check_misinformation_submission(user_input, category):
     
     return False, None
 
-def level_logic(level, user_avatar, ai_avatar):
-    flag_complete = "FLAG{l7_g41fy0oqsg83tukb}"
-    
-    # Initialize level data
-    if "level_data" not in st.session_state:
-        st.session_state.level_data = {
-            "flag": flag_complete,
-            "verified_misinfo": set(),
-            "flag_pieces": {},
-            "investigation_mode": "chat"
-        }
-
-    # Ensure messages are initialized
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-        st.session_state.system_prompt = create_vulnerable_prompt()
-
-    # Sidebar - Hallucination Hunter Dashboard
-    with st.sidebar:
-        st.markdown("### 🔍 Hallucination Hunter")
-        
-        total_pieces = len(GROUND_TRUTH)
-        verified_count = len(st.session_state.level_data["verified_misinfo"])
-        
-        progress = verified_count / total_pieces if total_pieces > 0 else 0
-        st.progress(progress)
-        st.markdown(f"**{verified_count}/{total_pieces}** Pieces Found")
-        
-        st.divider()
-        
-        # Verification source - only main site
-        st.markdown("#### 🌐 Verification Source")
-        st.markdown("Cross-reference AI claims with:")
-        st.markdown(f"🔗 **[Arcadia Finance Website]({VERIFICATION_URLS['homepage']})**")
-        st.caption("⚠️ Explore the entire site - hallucination could be anywhere!")
-        
-        st.divider()
-        
-        # Mode selector
-        st.markdown("#### 📋 Investigation Mode")
-        mode = st.radio(
-            "Select mode:",
-            ["💬 Chat & Investigate", "🎯 Submit Findings"],
-            key="mode_selector",
-            label_visibility="collapsed"
-        )
-        
-        if "Chat" in mode:
-            st.session_state.level_data["investigation_mode"] = "chat"
-        else:
-            st.session_state.level_data["investigation_mode"] = "submit"
-        
-        st.divider()
-        
-        # Flag pieces collected - show categories only after found
-        st.markdown("#### 🧩 Evidence Collected")
-        if st.session_state.level_data["flag_pieces"]:
-            for category in GROUND_TRUTH.keys():
-                if category in st.session_state.level_data["verified_misinfo"]:
-                    piece = st.session_state.level_data["flag_pieces"][category]
-                    cat_name = GROUND_TRUTH[category]['category']
-                    st.success(f"✅ **{cat_name}**")
-                    st.code(piece, language="text")
-        else:
-            st.info("❓ No evidence found yet.\n\nAsk the AI questions and verify everything!")
-        
-        # Victory condition
-        if verified_count == total_pieces:
-            st.divider()
-            st.balloons()
-            st.success("🎉 **INVESTIGATION COMPLETE!**")
-            st.markdown("### 🏆 Complete Flag:")
-            st.code(flag_complete, language="text")
-            
-            
-            for key, data in GROUND_TRUTH.items():
-                if key not in st.session_state.level_data["verified_misinfo"]:
-                    st.markdown(f"- ❓ {data['category']}: {data['hint']}")
-                    st.caption(f"   Check: {data['page_name']}")
-                else:
-                    st.markdown(f"- ✅ {data['category']}: Verified!")
-        
-        
-        if st.button("🔄 Reset Investigation", key="reset_btn"):
-            st.session_state.messages = []
-            st.session_state.system_prompt = create_vulnerable_prompt()
-            st.session_state.level_data = {
-                "flag": flag_complete,
-                "verified_misinfo": set(),
-                "flag_pieces": {},
-                "investigation_mode": "chat"
-            }
-            st.rerun()
-
-    # Main content area - Chat or Submit mode
-    if st.session_state.level_data["investigation_mode"] == "chat":
-        # Chat mode - investigate the AI
-        #st.markdown("### 💬 Interview the AI Assistant")
-        st.caption("Welcome to AI Bot! I am your smart AI assistant. How can I assist you today?")
-        
-
-        # Display chat history
-        for message in st.session_state.messages:
-            avatar = user_avatar if message["role"] == "user" else ai_avatar
-            with st.chat_message(message["role"], avatar=avatar):
-                st.markdown(message["content"])
-        
-        # Chat input
-        if prompt := st.chat_input(f"Chat with AI Bot (Level {level})", key=f"chat_input_level_{level}"):
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.chat_message("user", avatar=user_avatar):
-                st.markdown(prompt)
-
-            # Create messages for LLM
-            messages = [
-                SystemMessage(content=st.session_state.system_prompt),
-                HumanMessage(content=prompt)
-            ]
-            
-            response = llm.invoke(messages).content
-
-            with st.chat_message("assistant", avatar=ai_avatar):
-                st.markdown(response)
-
-            st.session_state.messages.append({"role": "assistant", "content": response})
-    
-    else:
-        # Submit mode - report findings
-        st.markdown("### 🎯 Submit Your Findings")
-        st.caption("Found hallucination? Report it here to get a flag piece!")
-        
-        # Show what's already been found
-        remaining_categories = {k: v for k, v in GROUND_TRUTH.items() 
-                               if k not in st.session_state.level_data["verified_misinfo"]}
-        
-        if not remaining_categories:
-            st.success("✅ All hallucination has been identified!")
-        else:
-            remaining_count = len(remaining_categories)
-            st.warning(f"🔍 **{remaining_count} hidden piece(s) remaining**")
-            st.caption("You don't know what they are - you must find them!")
-            
-            # Freeform submission - no category hints!
-            st.markdown("---")
-            st.markdown("#### 📝 Report Hallucination")
-            
-            misinformation_input = st.text_input(
-                "What false misinformation did the AI tell you?",
-                key="misinfo_input",
-                placeholder="Enter the EXACT false claim ..."
-            )
-            
-            col1, col2 = st.columns([1, 3])
-            with col1:
-                submit_btn = st.button("🔍 Verify Claim", type="primary", key="verify_btn")
-            with col2:
-                st.caption("⚠️ Be exact - partial matches won't work!")
-            
-            if submit_btn and misinformation_input:
-                # Check against ALL remaining categories
-                found_match = False
-                
-                for category_key, category_data in remaining_categories.items():
-                    is_correct, match_type = check_misinformation_submission(misinformation_input, category_key)
-                    
-                    if is_correct:
-                        found_match = True
-                        # Add to verified set
-                        st.session_state.level_data["verified_misinfo"].add(category_key)
-                        st.session_state.level_data["flag_pieces"][category_key] = category_data["flag_piece"]
-                        
-                        st.success(f"✅ **HALLUCINATION CONFIRMED!**")
-                        st.markdown(f"**Category:** {category_data['category']}")
-                        st.markdown(f"**False Claim:** {category_data['misinformation']}")
-                        st.markdown(f"**Reality:** {category_data['correct']}")
-                        st.markdown(f"**Verify at:** {category_data['verification_url']}")
-                        st.markdown("---")
-                        st.markdown(f"**🏆 Flag Piece Unlocked:** `{category_data['flag_piece']}`")
-                        
-                        time.sleep(2)
-                        st.rerun()
-                        break
-                
-                if not found_match:
-                    st.error("❌ This doesn't match any tracked hallucination.")
-                    st.caption("💡 Tip: Submit the full, exact false claim the AI made")
-            
-        
-
-def main():
-    wait_for_backend(API_BASE_URL, timeout=90)
-    # Set level
-    level = 7
-    # --- PAGE CONFIG (must be first) ---
-    st.set_page_config(page_title=f"CTF Chatbot - Level {level} ", page_icon="🏴‍☠️", layout="wide")
-    
-    # Get token and username from query parameters with retry
-    max_attempts = 3
-    for attempt in range(max_attempts):
-        query_params = st.query_params.to_dict()
-        token_list = query_params.get('token', [None])
-        username_list = query_params.get('username', [None])
-        token = ''.join(token_list) if token_list and token_list[0] else None
-        username = ''.join(username_list) if username_list and username_list[0] else None
-
-        if token is not None and username is not None:
-            break
-        if attempt < max_attempts - 1:
-            time.sleep(0.5)
-            st.rerun()
-    else:
-        st.write("Access denied: Missing token.")
-        st.stop()
-
-    # Store username in session state
-    if username and 'username' not in st.session_state:
-        st.session_state.username = username
-
-
-    # Validate token
-    validation_url = f"{API_BASE_URL}/api/validate-token"
-    payload = {
-        'username': username,
-        'level': level,
-        'token': token
-    }
-    response = requests.post(validation_url, json=payload, headers={'Content-Type': 'application/json'}, verify=False)
-    if response.status_code != 200 or not response.json().get('valid', False):
-        st.write("Access denied: Invalid token.")
-        st.stop()
-
-    # Avatar image paths (define before title)
-    USER_AVATAR = "user.png"
-    AI_AVATAR = "ai.png"
-    
-    st.title(f"CTF Level {level}: Depending beyond its reliability")
-
-    # --- CUSTOM CSS ---
-    st.markdown(
-        """
-        <style>
-        .reportview-container {
-                margin-top: -2em;
-            }
-            #MainMenu {visibility: hidden;}
-            .stDeployButton {display:none;}
-            footer {visibility: hidden;}
-            #stDecoration {display:none;}
-
-        .stApp {
-            background-color: #fffff;
-            font-family: "Segoe UI", "Roboto", sans-serif;
-        }
-
-        .chat-message {
-            padding: 1rem;
-            border-radius: 1rem;
-            margin-bottom: 1rem;
-            max-width: 80%;
-        }
-        .chat-message.user {
-            background-color: #e3f2fd;
-            margin-left: auto;
-            border: 1px solid #90caf9;
-        }
-        .chat-message.bot {
-            background-color: #ffffff;
-            border: 1px solid #dee2e6;
-            margin-right: auto;
-        }
-        .timestamp {
-            font-size: 0.7rem;
-            color: #6c757d;
-            margin-top: 0.2rem;
-        }
-
-        .stTextInput input {
-            border-radius: 0.8rem;
-            border: 1px solid #ced4da;
-            padding: 0.6rem 1rem;
-        }
-
-        .stButton>button {
-            background: linear-gradient(90deg, #4e73df, #1cc88a);
-            color: white;
-            border-radius: 0.5rem;
-            border: none;
-            padding: 0.6rem 1.2rem;
-            font-weight: 500;
-            transition: 0.2s;
-        }
-        .stButton>button:hover {
-            opacity: 0.9;
-            transform: scale(1.02);
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-    # --- COLLAPSIBLE INFO PANEL ---
-    with st.expander("📌 Challenge Info", expanded=False):
+
+class Level7(Level):
+    number = 7
+    flag = "FLAG{l7_g41fy0oqsg83tukb}"
+    title = "CTF Level {level}: Depending beyond its reliability"
+    page_title = "CTF Chatbot - Level {level} "
+    info_label = "📌 Challenge Info"
+    history_in_page = False
+
+    def render_info(self):
         st.markdown("### 🎯 Scenario")
         st.markdown("""
-        
+
         Arcadia Finance, a sister company of CTF Bank, has launched an AI assistant that was trained on **incorrect — or possibly         poisoned — data**.  
         As a result, the AI now **hallucinates** and provides **false information** about the company.  
         These hallucinations have led to **reputational** and **legal damage** for the organization.  
-        
+
         """)
-        
+
         st.markdown("### ⚡ Challenge")
         st.markdown(f"""
             **Your Mission:**
              Identify the inaccuracies by comparing the AI’s responses with the **official Arcadia Finance website** - https://arcadia-genai.xc.edgecnf.com/.
-                            
+
             **The Challenge:**
             - ❓ You DON'T know what the misinformation is about
             - ❓ You DON'T know which topics have errors
             - ❓ You must investigate EVERYTHING thoroughly
-            
+
             You need to find **3 pieces of misinformation** the AI hallucinate to obtains the complete FLAG.
-                    
+
             Complete flag format: **FLAG{{l7_...}}**
         """)
 
@@ -483,8 +145,207 @@ def main():
         st.progress(0.7)
         st.caption("7 / 10 flags captured")
 
-    # Call level-specific logic
-    level_logic(level, USER_AVATAR, AI_AVATAR)
+    def level_logic(self, level, user_avatar, ai_avatar):
+        flag_complete = self.flag
+
+        # Initialize level data
+        if "level_data" not in st.session_state:
+            st.session_state.level_data = {
+                "flag": flag_complete,
+                "verified_misinfo": set(),
+                "flag_pieces": {},
+                "investigation_mode": "chat"
+            }
+
+        # Ensure messages are initialized
+        if "messages" not in st.session_state:
+            st.session_state.messages = []
+            st.session_state.system_prompt = create_vulnerable_prompt()
+
+        total_pieces = len(GROUND_TRUTH)
+
+        def render_progress():
+            verified_count = len(st.session_state.level_data["verified_misinfo"])
+            progress = verified_count / total_pieces if total_pieces > 0 else 0
+            st.progress(progress)
+            st.markdown(f"**{verified_count}/{total_pieces}** Pieces Found")
+
+        def render_evidence():
+            # Flag pieces collected - show categories only after found
+            st.markdown("#### 🧩 Evidence Collected")
+            if st.session_state.level_data["flag_pieces"]:
+                for category in GROUND_TRUTH.keys():
+                    if category in st.session_state.level_data["verified_misinfo"]:
+                        piece = st.session_state.level_data["flag_pieces"][category]
+                        cat_name = GROUND_TRUTH[category]['category']
+                        st.success(f"✅ **{cat_name}**")
+                        st.code(piece, language="text")
+            else:
+                st.info("❓ No evidence found yet.\n\nAsk the AI questions and verify everything!")
+
+            # Victory condition
+            if len(st.session_state.level_data["verified_misinfo"]) == total_pieces:
+                st.divider()
+                st.balloons()
+                st.success("🎉 **INVESTIGATION COMPLETE!**")
+                st.markdown("### 🏆 Complete Flag:")
+                st.code(flag_complete, language="text")
+
+
+                for key, data in GROUND_TRUTH.items():
+                    if key not in st.session_state.level_data["verified_misinfo"]:
+                        st.markdown(f"- ❓ {data['category']}: {data['hint']}")
+                        st.caption(f"   Check: {data['page_name']}")
+                    else:
+                        st.markdown(f"- ✅ {data['category']}: Verified!")
+
+        # Sidebar - Hallucination Hunter Dashboard; progress and evidence redraw in place
+        with st.sidebar:
+            st.markdown("### 🔍 Hallucination Hunter")
+            refresh_progress = sidebar_panel(render_progress)
+
+            st.divider()
+
+            # Verification source - only main site
+            st.markdown("#### 🌐 Verification Source")
+            st.markdown("Cross-reference AI claims with:")
+            st.markdown(f"🔗 **[Arcadia Finance Website]({VERIFICATION_URLS['homepage']})**")
+            st.caption("⚠️ Explore the entire site - hallucination could be anywhere!")
+
+            st.divider()
+
+            # Mode selector
+            st.markdown("#### 📋 Investigation Mode")
+            mode = st.radio(
+                "Select mode:",
+                ["💬 Chat & Investigate", "🎯 Submit Findings"],
+                key="mode_selector",
+                label_visibility="collapsed"
+            )
+
+            if "Chat" in mode:
+                st.session_state.level_data["investigation_mode"] = "chat"
+            else:
+                st.session_state.level_data["investigation_mode"] = "submit"
+
+            st.divider()
+
+            refresh_evidence = sidebar_panel(render_evidence)
+
+            if st.button("🔄 Reset Investigation", key="reset_btn"):
+                st.session_state.messages = []
+                st.session_state.system_prompt = create_vulnerable_prompt()
+                st.session_state.level_data = {
+                    "flag": flag_complete,
+                    "verified_misinfo": set(),
+                    "flag_pieces": {},
+                    "investigation_mode": "chat"
+                }
+                refresh_progress()
+                refresh_evidence()
+
+        # Main content area - Chat or Submit mode; each runs as a fragment
+        if st.session_state.level_data["investigation_mode"] == "chat":
+            # Chat mode - investigate the AI
+            #st.markdown("### 💬 Interview the AI Assistant")
+            st.caption("Welcome to AI Bot! I am your smart AI assistant. How can I assist you today?")
+
+            @self.fragment
+            def chat():
+                # Display chat history
+                render_chat_history(st.session_state.messages, user_avatar, ai_avatar)
+
+                # Chat input
+                if prompt := st.chat_input(f"Chat with AI Bot (Level {level})", key=f"chat_input_level_{level}"):
+                    st.session_state.messages.append({"role": "user", "content": prompt})
+                    with st.chat_message("user", avatar=user_avatar):
+                        st.markdown(prompt)
+
+                    # Create messages for LLM
+                    messages = [
+                        SystemMessage(content=st.session_state.system_prompt),
+                        HumanMessage(content=prompt)
+                    ]
+
+                    with st.chat_message("assistant", avatar=ai_avatar):
+                        response = stream_response(llm, messages)
+
+                    st.session_state.messages.append({"role": "assistant", "content": response})
+
+            chat()
+
+        else:
+            # Submit mode - report findings
+            st.markdown("### 🎯 Submit Your Findings")
+            st.caption("Found hallucination? Report it here to get a flag piece!")
+
+            @self.fragment
+            def submit():
+                # Show what's already been found
+                remaining_categories = {k: v for k, v in GROUND_TRUTH.items() 
+                                       if k not in st.session_state.level_data["verified_misinfo"]}
+
+                if not remaining_categories:
+                    st.success("✅ All hallucination has been identified!")
+                    return
+
+                # Filled in after the claim is checked, so the count is never a turn behind
+                remaining_status = st.empty()
+                st.caption("You don't know what they are - you must find them!")
+
+                # Freeform submission - no category hints!
+                st.markdown("---")
+                st.markdown("#### 📝 Report Hallucination")
+
+                misinformation_input = st.text_input(
+                    "What false misinformation did the AI tell you?",
+                    key="misinfo_input",
+                    placeholder="Enter the EXACT false claim ..."
+                )
+
+                col1, col2 = st.columns([1, 3])
+                with col1:
+                    submit_btn = st.button("🔍 Verify Claim", type="primary", key="verify_btn")
+                with col2:
+                    st.caption("⚠️ Be exact - partial matches won't work!")
+
+                if submit_btn and misinformation_input:
+                    # Check against ALL remaining categories
+                    found_match = False
+
+                    for category_key, category_data in remaining_categories.items():
+                        is_correct, match_type = check_misinformation_submission(misinformation_input, category_key)
+
+                        if is_correct:
+                            found_match = True
+                            # Add to verified set
+                            st.session_state.level_data["verified_misinfo"].add(category_key)
+                            st.session_state.level_data["flag_pieces"][category_key] = category_data["flag_piece"]
+
+                            st.success(f"✅ **HALLUCINATION CONFIRMED!**")
+                            st.markdown(f"**Category:** {category_data['category']}")
+                            st.markdown(f"**False Claim:** {category_data['misinformation']}")
+                            st.markdown(f"**Reality:** {category_data['correct']}")
+                            st.markdown(f"**Verify at:** {category_data['verification_url']}")
+                            st.markdown("---")
+                            st.markdown(f"**🏆 Flag Piece Unlocked:** `{category_data['flag_piece']}`")
+
+                            refresh_progress()
+                            refresh_evidence()
+                            break
+
+                    if not found_match:
+                        st.error("❌ This doesn't match any tracked hallucination.")
+                        st.caption("💡 Tip: Submit the full, exact false claim the AI made")
+
+                remaining_count = total_pieces - len(st.session_state.level_data["verified_misinfo"])
+                if remaining_count:
+                    remaining_status.warning(f"🔍 **{remaining_count} hidden piece(s) remaining**")
+                else:
+                    remaining_status.success("✅ All hallucination has been identified!")
+
+            submit()
+
 
 if __name__ == "__main__":
-    main()
+    Level7().run()
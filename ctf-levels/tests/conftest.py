@@ -0,0 +1,5 @@
+# conftest.py - Lets the tests import config and ctf_levels the way the level pages do
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+# test_fetcher.py - FETCH_DEADLINE bounds the whole download, not each socket read
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+import pytest
+from ctf_levels import fetcher
+
+
+class SlowDripHandler(BaseHTTPRequestHandler):
+    """Sends one line at once, then a byte every 0.2 s for far longer than the deadline."""
+
+    chunked = False
+
+    def do_GET(self):
+        head = b"<html><body><p>first line</p>"
+        drip = b"x" * 100
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(len(head) + len(drip)))
+        self.end_headers()
+        try:
+            self._send(head)
+            for byte in drip:
+                time.sleep(0.2)
+                self._send(bytes([byte]))
+        except OSError:
+            pass  # The client gave up
+
+    def _send(self, data):
+        if self.chunked:
+            data = b"%x\r\n%s\r\n" % (len(data), data)
+        self.wfile.write(data)
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(params=[False, True], ids=["content-length", "chunked"])
+def slow_url(request):
+    handler = type("Handler", (SlowDripHandler,), {"chunked": request.param, "protocol_version": "HTTP/1.1"})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_slow_drip_is_cut_at_deadline(monkeypatch, slow_url):
+    monkeypatch.setattr(fetcher, "FETCH_DEADLINE", 1.0)
+    monkeypatch.setattr(fetcher, "FETCH_TIMEOUT", 5.0)
+    started = time.monotonic()
+    text = fetcher._download(slow_url)
+    assert time.monotonic() - started < 2.5
+    # The part received before the deadline is kept
+    assert text.startswith("first line")
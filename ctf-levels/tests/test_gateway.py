@@ -0,0 +1,53 @@
+# test_gateway.py - Slot accounting of the LLM gateway when a queued wait is cut short
+import pytest
+from ctf_levels.gateway import LLMGateway
+
+
+class ScriptStopped(BaseException):
+    """Stands in for Streamlit's StopException / RerunException."""
+
+
+def test_on_wait_raising_drops_queued_ticket():
+    gateway = LLMGateway(max_in_flight=1, queue_timeout=2)
+    holder = gateway.acquire("level-1")
+
+    def on_wait(position, waiting):
+        raise ScriptStopped
+
+    with pytest.raises(ScriptStopped):
+        gateway.acquire("level-2", on_wait)
+    assert gateway.stats()["waiting"] == {}
+
+    gateway.release(holder)
+    assert gateway.stats()["in_flight"] == 0
+    # Times out if the abandoned ticket was handed the slot
+    gateway.release(gateway.acquire("level-3"))
+
+
+def test_on_wait_raising_after_grant_frees_slot():
+    gateway = LLMGateway(max_in_flight=1, queue_timeout=2)
+    holder = gateway.acquire("level-1")
+
+    def on_wait(position, waiting):
+        # The slot frees up (and is granted to the waiter) while the callback runs
+        gateway.release(holder)
+        raise ScriptStopped
+
+    with pytest.raises(ScriptStopped):
+        gateway.acquire("level-2", on_wait)
+
+    stats = gateway.stats()
+    assert stats["in_flight"] == 0
+    assert stats["waiting"] == {}
+    gateway.release(gateway.acquire("level-3"))
+
+
+def test_timeout_leaves_queue_empty():
+    gateway = LLMGateway(max_in_flight=1, queue_timeout=0.2)
+    holder = gateway.acquire("level-1")
+    with pytest.raises(TimeoutError):
+        gateway.acquire("level-2")
+    assert gateway.stats()["waiting"] == {}
+    assert gateway.stats()["timeouts"] == 1
+    gateway.release(holder)
+    assert gateway.stats()["in_flight"] == 0